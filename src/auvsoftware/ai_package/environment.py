@@ -127,30 +127,26 @@ class AUVEnvironment:
     def _fetch_state(self) -> WorldState:
         s = WorldState()
         try:
-            row = self._client.latest("depth")
-            if row:
-                s.depth = float(row.get("DEPTH", 0.0))
-        except AUVRequestError:
-            pass
-        try:
-            row = self._client.latest("imu")
-            if row:
-                s.accel_x = float(row.get("ACCEL_X", 0.0))
-                s.accel_y = float(row.get("ACCEL_Y", 0.0))
-                s.accel_z = float(row.get("ACCEL_Z", 9.81))
-                s.gyro_x  = float(row.get("GYRO_X",  0.0))
-                s.gyro_y  = float(row.get("GYRO_Y",  0.0))
-                s.gyro_z  = float(row.get("GYRO_Z",  0.0))
-                s.mag_x   = float(row.get("MAG_X",   0.0))
-                s.mag_y   = float(row.get("MAG_Y",   0.0))
-                s.mag_z   = float(row.get("MAG_Z",   0.0))
-        except AUVRequestError:
-            pass
-        try:
-            page = self._client.list("detections", limit=MAX_DETECTIONS)
-            s.detections = page.get("items", [])
+            snap = self._client.snapshot(
+                ["depth", "imu"], rows={"detections": MAX_DETECTIONS}
+            )
         except AUVRequestError:
-            pass
+            return s
+        row = snap.get("depth")
+        if row:
+            s.depth = float(row.get("DEPTH", 0.0))
+        row = snap.get("imu")
+        if row:
+            s.accel_x = float(row.get("ACCEL_X", 0.0))
+            s.accel_y = float(row.get("ACCEL_Y", 0.0))
+            s.accel_z = float(row.get("ACCEL_Z", 9.81))
+            s.gyro_x  = float(row.get("GYRO_X",  0.0))
+            s.gyro_y  = float(row.get("GYRO_Y",  0.0))
+            s.gyro_z  = float(row.get("GYRO_Z",  0.0))
+            s.mag_x   = float(row.get("MAG_X",   0.0))
+            s.mag_y   = float(row.get("MAG_Y",   0.0))
+            s.mag_z   = float(row.get("MAG_Z",   0.0))
+        s.detections = snap.get("detections") or []
         return s
 
     def _apply_action(self, action: np.ndarray) -> None:
@@ -57,8 +57,9 @@ class UsbCamera:
                     continue
 
                 h, w = frame.shape[:2]
-                for det in self._detector.detect(frame):
-                    self._post(det)
+                dets = self._detector.detect(frame)
+                self._post(dets)
+                for det in dets:
                     frame = _draw(frame, det, w, h)
 
                 _, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 75])
@@ -70,18 +71,24 @@ class UsbCamera:
             cap.release()
             self._client.close()
 
-    def _post(self, det: Detection) -> None:
+    def _post(self, dets: list[Detection]) -> None:
+        """Upload every detection of one frame in a single batch request."""
+        if not dets:
+            return
+        rows = [
+            {
+                "CAMERA": "usb",
+                "CLASS_NAME": det.class_name,
+                "CONFIDENCE": det.confidence,
+                "BBOX_X": det.bbox_x,
+                "BBOX_Y": det.bbox_y,
+                "BBOX_W": det.bbox_w,
+                "BBOX_H": det.bbox_h,
+                "DISTANCE": -1.0,
+            }
+            for det in dets
+        ]
         try:
-            self._client.post(
-                "detections",
-                CAMERA="usb",
-                CLASS_NAME=det.class_name,
-                CONFIDENCE=det.confidence,
-                BBOX_X=det.bbox_x,
-                BBOX_Y=det.bbox_y,
-                BBOX_W=det.bbox_w,
-                BBOX_H=det.bbox_h,
-                DISTANCE=-1.0,
-            )
+            self._client.post_many("detections", rows)
         except Exception:
-            log.debug("Failed to post USB detection", exc_info=True)
+            log.debug("Failed to post USB detections", exc_info=True)
@@ -83,6 +83,7 @@ class ZedCamera:
                 frame = cv2.cvtColor(img_mat.get_data(), cv2.COLOR_RGBA2BGR)
                 h, w = frame.shape[:2]
 
+                found: list[tuple[Detection, float]] = []
                 for det in self._detector.detect(frame):
                     cx = int((det.bbox_x + det.bbox_w / 2) * w)
                     cy = int((det.bbox_y + det.bbox_h / 2) * h)
@@ -90,8 +91,9 @@ class ZedCamera:
                     err, val = depth_mat.get_value(cx, cy)
                     raw = float(val[0]) if hasattr(val, "__len__") else float(val)
                     distance = raw if err == sl.ERROR_CODE.SUCCESS and np.isfinite(raw) else -1.0
-                    self._post(det, distance)
+                    found.append((det, distance))
                     frame = _draw(frame, det, distance, w, h)
+                self._post(found)
 
                 _, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 75])
                 with self._lock:
@@ -102,18 +104,24 @@ class ZedCamera:
             zed.close()
             self._client.close()
 
-    def _post(self, det: Detection, distance: float) -> None:
+    def _post(self, found: list[tuple[Detection, float]]) -> None:
+        """Upload every detection of one frame in a single batch request."""
+        if not found:
+            return
+        rows = [
+            {
+                "CAMERA": "zed",
+                "CLASS_NAME": det.class_name,
+                "CONFIDENCE": det.confidence,
+                "BBOX_X": det.bbox_x,
+                "BBOX_Y": det.bbox_y,
+                "BBOX_W": det.bbox_w,
+                "BBOX_H": det.bbox_h,
+                "DISTANCE": distance,
+            }
+            for det, distance in found
+        ]
         try:
-            self._client.post(
-                "detections",
-                CAMERA="zed",
-                CLASS_NAME=det.class_name,
-                CONFIDENCE=det.confidence,
-                BBOX_X=det.bbox_x,
-                BBOX_Y=det.bbox_y,
-                BBOX_W=det.bbox_w,
-                BBOX_H=det.bbox_h,
-                DISTANCE=distance,
-            )
+            self._client.post_many("detections", rows)
         except Exception:
-            log.debug("Failed to post ZED detection", exc_info=True)
+            log.debug("Failed to post ZED detections", exc_info=True)
@@ -0,0 +1,115 @@
+"""
+bench_readers.py
+~~~~~~~~~~~~~~~~
+Insert latency of a 20 Hz writer while other clients run heavy reads.
+
+Posts to /outputs at --rate Hz, the way the ESC control loop does, and
+reports latency percentiles first with no other traffic and then while
+--readers threads loop over costly GETs: deep list pages with totals, raw
+aggregates over the whole imu table, and full exports.
+
+Run it against a server started with AUV_DB_READERS=0 (reads share the
+writer's connection), then again with the default pool, on the same
+database file:
+
+    python bench_readers.py --seed 500000     # once, to fill imu
+    python bench_readers.py --readers 8
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+
+_IMU = ("ACCEL_X", "ACCEL_Y", "ACCEL_Z", "GYRO_X", "GYRO_Y", "GYRO_Z",
+        "MAG_X", "MAG_Y", "MAG_Z")
+_READS = (
+    "/imu?limit=500&offset=5000&start=1970-01-01T00:00:00Z",
+    "/imu/aggregate?bucket=1500ms&fields=ACCEL_X,GYRO_Z",
+    "/imu/export?format=npy",
+)
+
+
+def seed(base: str, rows: int) -> None:
+    """Fill imu with *rows* rows so the reads have something to chew on."""
+    session = requests.Session()
+    t0 = time.time() - rows / 100.0
+    for first in range(0, rows, 5000):
+        batch = [
+            {"TIMESTAMP": datetime.fromtimestamp(t0 + i / 100.0, timezone.utc).isoformat(),
+             **{k: float(i) for k in _IMU}}
+            for i in range(first, min(first + 5000, rows))
+        ]
+        session.post(f"{base}/imu/batch", json=batch, timeout=60).raise_for_status()
+
+
+def measure(base: str, rate: float, seconds: float) -> list[float]:
+    """Latency in ms of each /outputs insert, posted at *rate* Hz."""
+    session = requests.Session()
+    body = {f"MOTOR{i}": 1500 for i in range(1, 9)} | {"S1": 0, "S2": 0, "S3": 0}
+    latencies = []
+    period = 1.0 / rate
+    deadline = time.monotonic() + seconds
+    next_at = time.monotonic()
+    while time.monotonic() < deadline:
+        t = time.perf_counter()
+        session.post(f"{base}/outputs", json=body, timeout=30).raise_for_status()
+        latencies.append((time.perf_counter() - t) * 1000.0)
+        next_at += period
+        time.sleep(max(0.0, next_at - time.monotonic()))
+    return latencies
+
+
+def load(base: str, stop: threading.Event, counts: list[int], slot: int) -> None:
+    session = requests.Session()
+    i = slot
+    while not stop.is_set():
+        session.get(base + _READS[i % len(_READS)], timeout=120).raise_for_status()
+        counts[slot] += 1
+        i += 1
+
+
+def report(label: str, ms: list[float]) -> None:
+    q = statistics.quantiles(ms, n=100)
+    print(f"{label:<12} n={len(ms):<5} p50={q[49]:6.1f} ms  p95={q[94]:6.1f} ms  "
+          f"p99={q[98]:6.1f} ms  max={max(ms):6.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Insert latency of a 20 Hz writer under heavy read load."
+    )
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--rate", type=float, default=20.0, help="inserts per second")
+    parser.add_argument("--seconds", type=float, default=15.0, help="per phase")
+    parser.add_argument("--readers", type=int, default=8, help="concurrent read clients")
+    parser.add_argument("--seed", type=int, default=0, help="imu rows to insert first")
+    args = parser.parse_args()
+    base = args.url.rstrip("/")
+
+    if args.seed:
+        seed(base, args.seed)
+    print(requests.get(f"{base}/readers/stats", timeout=5).json())
+
+    report("idle", measure(base, args.rate, args.seconds))
+
+    stop = threading.Event()
+    counts = [0] * args.readers
+    threads = [
+        threading.Thread(target=load, args=(base, stop, counts, n), daemon=True)
+        for n in range(args.readers)
+    ]
+    for t in threads:
+        t.start()
+    try:
+        report("under load", measure(base, args.rate, args.seconds))
+    finally:
+        stop.set()
+    print(f"reads completed: {sum(counts)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import asyncio
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+
+class RowBroker:
+    """
+    Fan-out of committed rows to live subscribers (SSE / WebSocket streams).
+
+    Each subscriber owns a bounded queue. Publishing never blocks the
+    writer path: when a slow subscriber's queue is full its oldest row is
+    dropped, since consumers of a live stream care about the newest state.
+    Rows are published only after their transaction has committed, so a
+    subscriber never sees a row that a reader could not also see.
+    """
+
+    def __init__(self, queue_size: int = 256) -> None:
+        self.queue_size = queue_size
+        self._subs: dict[str, set[asyncio.Queue]] = {}
+        self.dropped = 0
+
+    @contextmanager
+    def subscribe(self, table: str) -> Iterator[asyncio.Queue]:
+        """Queue receiving every row committed to *table* while open."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        subs = self._subs.setdefault(table, set())
+        subs.add(queue)
+        try:
+            yield queue
+        finally:
+            subs.discard(queue)
+
+    def publish(self, table: str, rows: Iterable[dict]) -> None:
+        subs = self._subs.get(table)
+        if not subs:
+            return
+        for row in rows:
+            for queue in subs:
+                if queue.full():
+                    queue.get_nowait()
+                    self.dropped += 1
+                queue.put_nowait(row)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": {t: len(s) for t, s in self._subs.items() if s},
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,251 @@
+import time
+from collections import deque
+from typing import Iterable, Optional
+
+import aiosqlite
+
+from schema import TableSpec
+
+# Ring entries are ordered by (TS_US, ID), the same order the SQL uses
+Key = tuple[int, int]
+
+
+class _Ring:
+    __slots__ = ("rows", "complete", "hits", "misses")
+
+    def __init__(self, max_rows: int) -> None:
+        # (arrival time, (TS_US, ID), row) in ascending key order
+        self.rows: deque[tuple[float, Key, dict]] = deque(maxlen=max_rows)
+        # True while the ring holds every row of the table (nothing evicted)
+        self.complete = False
+        self.hits = 0
+        self.misses = 0
+
+    def key_of(self, id_: int) -> Optional[Key]:
+        for _, key, _row in reversed(self.rows):
+            if key[1] == id_:
+                return key
+        return None
+
+
+class HotWindowCache:
+    """
+    Fixed-size window of the most recent rows of each table.
+
+    Rings are filled after each write commits and hold at most ``max_rows``
+    rows no older than ``max_age_s`` seconds (by arrival). ``/latest`` and
+    list queries over the recent window are answered from the ring; anything
+    the ring cannot answer exactly is reported as a miss so the caller falls
+    back to SQLite. A ring always holds every row whose (TS_US, ID) key is at
+    or above its oldest entry, which is what makes those answers exact.
+    """
+
+    def __init__(self, max_rows: int = 1000, max_age_s: float = 60.0) -> None:
+        self.max_rows = max_rows
+        self.max_age_s = max_age_s
+        self._rings: dict[str, _Ring] = {}
+        # Exact row counts, kept current on every committed insert/delete
+        self._counts: dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_rows > 0
+
+    async def warm(self, db: aiosqlite.Connection, specs: Iterable[TableSpec]) -> None:
+        """Seed each ring with the newest rows already on disk, and count rows."""
+        now = time.monotonic()
+        for spec in specs:
+            cur = await db.execute(f"SELECT COUNT(*) FROM {spec.name};")
+            (self._counts[spec.name],) = await cur.fetchone()
+            await cur.close()
+            if not self.enabled:
+                continue
+            cur = await db.execute(
+                f"{spec.select_sql} ORDER BY TS_US DESC, ID DESC LIMIT ?;",
+                (self.max_rows,),
+            )
+            rows = await cur.fetchall()
+            await cur.close()
+            ring = self._ring(spec.name)
+            ring.rows.extend(
+                (now, (r[1], r[0]), spec.to_dict(r)) for r in reversed(rows)
+            )
+            ring.complete = len(rows) < self.max_rows
+
+    # ------------------------------------------------------------------
+    # Writes (call only after the owning transaction has committed)
+    # ------------------------------------------------------------------
+    def add(self, table: str, ts_us: int, row: dict) -> None:
+        self.add_many(table, ((ts_us, row),))
+
+    def add_many(self, table: str, rows: Iterable[tuple[int, dict]]) -> None:
+        """Record committed rows, given as (TS_US, row dict) pairs."""
+        rows = list(rows)
+        if table in self._counts:
+            self._counts[table] += len(rows)
+        if not self.enabled:
+            return
+        ring = self._ring(table)
+        now = time.monotonic()
+        for ts_us, row in rows:
+            key = (ts_us, row["ID"])
+            if not ring.rows or key > ring.rows[-1][1]:
+                if len(ring.rows) == ring.rows.maxlen:
+                    ring.rows.popleft()
+                    ring.complete = False
+                ring.rows.append((now, key, row))
+                continue
+            # Stamped earlier than the newest row; keep the ring in key
+            # order. A row older than the whole window only belongs in a
+            # complete ring.
+            idx = next(i for i, (_, k, _r) in enumerate(ring.rows) if k > key)
+            if idx == 0 and not ring.complete:
+                continue
+            if len(ring.rows) == ring.rows.maxlen:
+                ring.rows.popleft()
+                ring.complete = False
+                idx -= 1
+            ring.rows.insert(idx, (now, key, row))
+
+    def discard(self, table: str, id_: int) -> None:
+        """Forget a row that was just deleted."""
+        if table in self._counts:
+            self._counts[table] -= 1
+        ring = self._rings.get(table)
+        if ring is None:
+            return
+        for item in ring.rows:
+            if item[1][1] == id_:
+                ring.rows.remove(item)
+                return
+
+    def expire(self, table: str, cutoff_us: int, deleted: int) -> None:
+        """Forget rows older than *cutoff_us* after *deleted* of them were removed."""
+        if table in self._counts:
+            self._counts[table] -= deleted
+        ring = self._rings.get(table)
+        if ring is None:
+            return
+        while ring.rows and ring.rows[0][1][0] < cutoff_us:
+            ring.rows.popleft()
+
+    # ------------------------------------------------------------------
+    # Reads: misses are counted and tell the caller to query SQLite
+    # ------------------------------------------------------------------
+    def latest(self, table: str) -> tuple[bool, Optional[dict]]:
+        """
+        ``(True, row)`` on a hit, with row None when the table is known to be
+        empty; ``(False, None)`` when the ring cannot answer.
+        """
+        ring = self._fresh(table)
+        if ring is None or (not ring.rows and not ring.complete):
+            self._miss(ring)
+            return False, None
+        ring.hits += 1
+        return True, (ring.rows[-1][2] if ring.rows else None)
+
+    def window(
+        self, table: str, limit: int, offset: int,
+        start_us: Optional[int], end_us: Optional[int],
+        before_id: Optional[int] = None, after_id: Optional[int] = None,
+        need_total: bool = True,
+    ) -> Optional[tuple[list[dict], Optional[int]]]:
+        """
+        Answer a list query from the ring: newest first, or oldest first when
+        paging forward with *after_id*. Returns (page, total) -- total is
+        None unless *need_total* -- or None when rows the answer depends on
+        may lie outside the ring.
+        """
+        ring = self._fresh(table)
+        if ring is None:
+            return self._miss(ring)
+        # Every matching row is in the ring if nothing was ever evicted, or
+        # if the oldest cached row already predates the range start.
+        covered = ring.complete or (
+            start_us is not None and bool(ring.rows) and ring.rows[0][1][0] < start_us
+        )
+        total: Optional[int] = None
+        if need_total:
+            if start_us is None and end_us is None and table in self._counts:
+                total = self._counts[table]
+            elif not covered:
+                return self._miss(ring)
+
+        # Cursors are only usable when their row is in the ring
+        before = after = None
+        if before_id is not None and (before := ring.key_of(before_id)) is None:
+            return self._miss(ring)
+        if after_id is not None and (after := ring.key_of(after_id)) is None:
+            return self._miss(ring)
+
+        matches = [
+            (k, r) for _, k, r in reversed(ring.rows)
+            if (start_us is None or k[0] >= start_us)
+            and (end_us is None or k[0] <= end_us)
+        ]
+        if need_total and total is None:
+            total = len(matches)
+
+        page = [
+            (k, r) for k, r in matches
+            if (before is None or k < before) and (after is None or k > after)
+        ]
+        if after is not None:
+            # Forward paging: every row after a cursor in the ring is cached
+            page.reverse()
+        elif not covered and len(page) < offset + limit:
+            # Newest-first pages are exact once the ring yields enough rows
+            return self._miss(ring)
+
+        ring.hits += 1
+        return [r for _, r in page[offset:offset + limit]], total
+
+    def count(self, table: str) -> Optional[int]:
+        """Row count of *table*, tracked since warm(); None if unknown."""
+        return self._counts.get(table)
+
+    def stats(self) -> dict:
+        tables = {}
+        for name in dict.fromkeys([*self._counts, *self._rings]):
+            r = self._rings.get(name) or _Ring(0)
+            tables[name] = {"rows": len(r.rows), "complete": r.complete,
+                            "hits": r.hits, "misses": r.misses,
+                            "count": self._counts.get(name)}
+        return {
+            "enabled": self.enabled,
+            "max_rows": self.max_rows,
+            "max_age_s": self.max_age_s,
+            "hits": sum(t["hits"] for t in tables.values()),
+            "misses": sum(t["misses"] for t in tables.values()),
+            "tables": tables,
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _ring(self, table: str) -> _Ring:
+        ring = self._rings.get(table)
+        if ring is None:
+            ring = self._rings[table] = _Ring(self.max_rows)
+        return ring
+
+    def _fresh(self, table: str) -> Optional[_Ring]:
+        """
+        The table's ring with rows older than max_age_s dropped. The newest
+        row is always kept so /latest on slow tables keeps hitting.
+        """
+        if not self.enabled:
+            return None
+        ring = self._ring(table)
+        if self.max_age_s > 0:
+            cutoff = time.monotonic() - self.max_age_s
+            while len(ring.rows) > 1 and ring.rows[0][0] < cutoff:
+                ring.rows.popleft()
+                ring.complete = False
+        return ring
+
+    @staticmethod
+    def _miss(ring: Optional[_Ring]) -> None:
+        if ring is not None:
+            ring.misses += 1
+        return None
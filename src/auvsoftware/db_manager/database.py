@@ -1,18 +1,54 @@
-from datetime import datetime
-from typing import List, Optional, Tuple
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
 
 import aiosqlite
 from config import get_env
+from schema import TABLE_SPECS, TableSpec
+
+# Connection tuning applied on connect. Each can be overridden with the
+# matching AUV_DB_<NAME> environment variable (see load_pragmas).
+DEFAULT_PRAGMAS: Dict[str, str] = {
+    "auto_vacuum": "INCREMENTAL", # lets retention shrink the file; new DBs only
+    "journal_mode": "WAL",        # readers never block the writer
+    "synchronous": "NORMAL",      # fsync on checkpoint, not on every commit
+    "cache_size": "-16000",       # KiB when negative: ~16 MB page cache
+    "mmap_size": "134217728",     # 128 MB memory-mapped reads
+    "temp_store": "MEMORY",
+}
+
+_PRAGMA_VALUE = re.compile(r"^-?[A-Za-z0-9_]+$")
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Legacy ISO-8601 TIMESTAMP text -> epoch microseconds (stored text had ms)
+_LEGACY_TS_US = (
+    "CAST(ROUND((julianday(TIMESTAMP) - 2440587.5) * 86400000.0) AS INTEGER) * 1000"
+)
+
+
+def load_pragmas() -> Dict[str, str]:
+    """Return DEFAULT_PRAGMAS with AUV_DB_<NAME> environment overrides."""
+    pragmas = {}
+    for name, default in DEFAULT_PRAGMAS.items():
+        value = get_env(f"AUV_DB_{name.upper()}", default=default)
+        if not _PRAGMA_VALUE.match(value):
+            raise ValueError(f"Invalid value for AUV_DB_{name.upper()}: {value!r}")
+        pragmas[name] = value
+    return pragmas
 
 
 class DatabaseManager:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, pragmas: Optional[Dict[str, str]] = None):
         self.db_path = db_path
+        self.pragmas = pragmas or {}
         self.connection: Optional[aiosqlite.Connection] = None
 
     async def connect(self):
         self.connection = await aiosqlite.connect(self.db_path)
         await self.connection.execute("PRAGMA foreign_keys = ON;")
+        for name, value in self.pragmas.items():
+            await self.connection.execute(f"PRAGMA {name} = {value};")
         await self.connection.commit()
 
     async def close(self):
@@ -41,131 +77,90 @@ class DatabaseManager:
         await cursor.close()
         return rows
 
-    async def fetchlatest(self, table: str, timestamp_column: str) -> Optional[aiosqlite.Row]:
-        query = f"SELECT * FROM {table} ORDER BY {timestamp_column} DESC LIMIT 1"
+    async def fetchlatest(self, table: str, timestamp_column: str = "TS_US") -> Optional[aiosqlite.Row]:
+        # Single descent of the timestamp index instead of a sort
+        query = f"SELECT * FROM {table} ORDER BY {timestamp_column} DESC, ID DESC LIMIT 1"
         return await self.fetchone(query)
 
     async def fetchbetween(self, table: str, timestamp_column: str, start: datetime, end: datetime) -> List[aiosqlite.Row]:
+        # Integer epoch-microsecond bounds; naive datetimes are taken as UTC
         query = f"SELECT * FROM {table} WHERE {timestamp_column} BETWEEN ? AND ?"
-        params = (start.isoformat(), end.isoformat())
+        params = (_to_us(start), _to_us(end))
         return await self.fetchall(query, params)
 
     async def setup(self):
-        queries = [
-            # Inputs Table
-            """
-                CREATE TABLE IF NOT EXISTS inputs (
-                    ID INTEGER PRIMARY KEY AUTOINCREMENT,
-                    TIMESTAMP TEXT NOT NULL,
-                    SURGE INTEGER NOT NULL,
-                    SWAY INTEGER NOT NULL,
-                    HEAVE INTEGER NOT NULL,
-                    ROLL INTEGER NOT NULL,
-                    PITCH INTEGER NOT NULL,
-                    YAW INTEGER NOT NULL,
-                    S1 BOOLEAN NOT NULL,
-                    S2 BOOLEAN NOT NULL,
-                    S3 INTEGER NOT NULL
-                );
-            """,
-            # Outputs Table
-            """
-                CREATE TABLE IF NOT EXISTS outputs (
-                    ID INTEGER PRIMARY KEY AUTOINCREMENT,
-                    TIMESTAMP TEXT NOT NULL,
-                    MOTOR1 INTEGER NOT NULL,
-                    MOTOR2 INTEGER NOT NULL,
-                    MOTOR3 INTEGER NOT NULL,
-                    MOTOR4 INTEGER NOT NULL,
-                    MOTOR5 INTEGER NOT NULL,
-                    MOTOR6 INTEGER NOT NULL,
-                    MOTOR7 INTEGER NOT NULL,
-                    MOTOR8 INTEGER NOT NULL,
-                    S1 INTEGER NOT NULL,
-                    S2 INTEGER NOT NULL,
-                    S3 INTEGER NOT NULL
-                );
-            """,
-            # Depth Table
-            """
-                CREATE TABLE IF NOT EXISTS depth (
-                    ID INTEGER PRIMARY KEY AUTOINCREMENT,
-                    TIMESTAMP TEXT NOT NULL,
-                    DEPTH REAL NOT NULL
-                );
-            """,
-            # IMU Table
-            """
-                CREATE TABLE IF NOT EXISTS imu (
-                    ID INTEGER PRIMARY KEY AUTOINCREMENT,
-                    TIMESTAMP TEXT NOT NULL,
-                    ACCEL_X REAL NOT NULL,
-                    ACCEL_Y REAL NOT NULL,
-                    ACCEL_Z REAL NOT NULL,
-                    GYRO_X REAL NOT NULL,
-                    GYRO_Y REAL NOT NULL,
-                    GYRO_Z REAL NOT NULL,
-                    MAG_X REAL NOT NULL,
-                    MAG_Y REAL NOT NULL,
-                    MAG_Z REAL NOT NULL
-                );
-            """,
-            # PID Gains Table
-            """
-                CREATE TABLE IF NOT EXISTS pid_gains (
-                    ID INTEGER PRIMARY KEY AUTOINCREMENT,
-                    TIMESTAMP TEXT NOT NULL,
-                    ROLL_KP REAL NOT NULL,
-                    ROLL_KI REAL NOT NULL,
-                    ROLL_KD REAL NOT NULL,
-                    PITCH_KP REAL NOT NULL,
-                    PITCH_KI REAL NOT NULL,
-                    PITCH_KD REAL NOT NULL
-                );
-            """,
-            # Power Safety Table
-            """
-                CREATE TABLE IF NOT EXISTS power_safety (
-                    ID INTEGER PRIMARY KEY AUTOINCREMENT,
-                    TIMESTAMP TEXT NOT NULL,
-                    B1_VOLTAGE INTEGER NOT NULL,
-                    B2_VOLTAGE INTEGER NOT NULL,
-                    B3_VOLTAGE INTEGER NOT NULL,
-                    B1_CURRENT INTEGER NOT NULL,
-                    B2_CURRENT INTEGER NOT NULL,
-                    B3_CURRENT INTEGER NOT NULL,
-                    B1_TEMP INTEGER NOT NULL,
-                    B2_TEMP INTEGER NOT NULL,
-                    B3_TEMP INTEGER NOT NULL
-                );
-            """,
-            # Detections Table
-            """
-                CREATE TABLE IF NOT EXISTS detections (
-                    ID INTEGER PRIMARY KEY AUTOINCREMENT,
-                    TIMESTAMP TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now')),
-                    CAMERA TEXT NOT NULL,
-                    CLASS_NAME TEXT NOT NULL,
-                    CONFIDENCE REAL NOT NULL,
-                    BBOX_X REAL NOT NULL,
-                    BBOX_Y REAL NOT NULL,
-                    BBOX_W REAL NOT NULL,
-                    BBOX_H REAL NOT NULL,
-                    DISTANCE REAL NOT NULL
-                );
-            """
-        ]
-
-        for query in queries:
-            if self.connection:
+        """
+        Create every table in the schema registry along with its indexes and
+        rollups. A rollup created on a database that already holds rows is
+        backfilled from the raw table before its trigger takes over.
+        Tables from before TS_US existed are migrated first.
+        """
+        for spec in TABLE_SPECS:
+            await self._migrate_text_timestamps(spec)
+            await self.connection.execute(spec.create_sql)
+            for query in spec.index_sql:
                 await self.connection.execute(query)
+            for rollup in spec.rollup_tables:
+                exists = await self.fetchone(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?;",
+                    (rollup.name,),
+                )
+                await self.connection.execute(rollup.create_sql)
+                if not exists:
+                    await self.connection.execute(rollup.backfill_sql)
+                await self.connection.execute(rollup.trigger_sql)
+        await self.connection.commit()
+
+    async def _migrate_text_timestamps(self, spec: TableSpec) -> None:
+        """
+        Rebuild a table that still stores TIMESTAMP as ISO-8601 text into
+        the TS_US layout, converting each timestamp once. The rebuild keeps
+        IDs and the AUTOINCREMENT counter, and runs in one transaction.
+        Indexes and triggers on the old table are recreated by setup().
+        """
+        cols = [r[1] for r in await self.fetchall(f"PRAGMA table_info({spec.name});")]
+        if "TIMESTAMP" not in cols or "TS_US" in cols:
+            return
+        db = self.connection
+        tmp = f"{spec.name}__ts_us"
+        data_cols = ", ".join(c.name for c in spec.columns)
+        await db.commit()  # close any implicit transaction from earlier steps
+        await db.execute("BEGIN;")
+        try:
+            seq = await self.fetchone(
+                "SELECT seq FROM sqlite_sequence WHERE name = ?;", (spec.name,)
+            )
+            await db.execute(spec.create_sql_for(tmp))
+            await db.execute(
+                f"INSERT INTO {tmp} (ID, TS_US, {data_cols}) "
+                f"SELECT ID, {_LEGACY_TS_US}, {data_cols} FROM {spec.name};"
+            )
+            await db.execute(f"DROP TABLE {spec.name};")
+            await db.execute(f"ALTER TABLE {tmp} RENAME TO {spec.name};")
+            if seq is not None:
+                await db.execute(
+                    "UPDATE sqlite_sequence SET seq = max(seq, ?) WHERE name = ?;",
+                    (seq[0], spec.name),
+                )
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+
+
+def _to_us(dt: datetime) -> int:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - _EPOCH) // timedelta(microseconds=1)
 
 
 if __name__ == "__main__":
     import asyncio
 
     async def main():
-        db_manager = DatabaseManager(get_env("AUV_DB_PATH", default="auv_database.db"))
+        db_manager = DatabaseManager(
+            get_env("AUV_DB_PATH", default="auv_database.db"), load_pragmas()
+        )
         await db_manager.connect()
         await db_manager.setup()
         await db_manager.close()
@@ -1,132 +1,175 @@
+import asyncio
+import os
 from contextlib import asynccontextmanager
-from typing import AsyncIterator
+from typing import AsyncIterator, Optional
 
 import aiosqlite
 from config import get_env
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
+from fastapi.requests import HTTPConnection
 
-from database import DatabaseManager
+from broker import RowBroker
+from cache import HotWindowCache
+from database import DatabaseManager, load_pragmas
+from readers import ReaderPool
+from retention import RetentionTask, load_rules
+from schema import ROUTED, TABLE_SPECS
+from sessions import SessionStore, carry_over
+from writer import GroupCommitWriter
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     """
-    App startup/shutdown: create the DB connection, ensure tables exist,
-    enable foreign keys, and make rows accessible by column name.
+    App startup/shutdown: create the DB connection, ensure the tables and
+    indexes in the schema registry exist, start the group-commit writer that
+    performs every insert/delete on that connection, open the pool of
+    read-only connections that serves every GET, warm the hot-window cache that serves
+    /latest and recent list queries, create the broker that pushes new
+    rows to /stream subscribers, and start the retention task that deletes
+    expired rows.
+
+    The database is the active session's file (AUV_DB_PATH until a session
+    is opened). AUV_DB_NEW_SESSION=1 opens a fresh session at startup.
     """
     db_path = get_env("AUV_DB_PATH", default="auv_database.db")
-    dbm = DatabaseManager(db_path)
+    sessions = SessionStore(
+        db_path,
+        get_env(
+            "AUV_DB_SESSION_DIR",
+            default=os.path.join(os.path.dirname(db_path) or ".", "sessions"),
+        ),
+    )
+    dbm = DatabaseManager(sessions.path(sessions.active), load_pragmas())
     await dbm.connect()
 
-    # Name-based access for rows (row["COL"])
-    dbm.connection.row_factory = aiosqlite.Row
-
-    # Ensure tables exist and set DB-side default timestamps in UTC
-    await dbm.connection.executescript(
-        """
-        CREATE TABLE IF NOT EXISTS inputs (
-            ID INTEGER PRIMARY KEY AUTOINCREMENT,
-            TIMESTAMP TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
-            SURGE INTEGER NOT NULL,
-            SWAY INTEGER NOT NULL,
-            HEAVE INTEGER NOT NULL,
-            ROLL INTEGER NOT NULL,
-            PITCH INTEGER NOT NULL,
-            YAW INTEGER NOT NULL,
-            S1 BOOLEAN NOT NULL,
-            S2 BOOLEAN NOT NULL,
-            S3 INTEGER NOT NULL
-        );
-
-        CREATE TABLE IF NOT EXISTS outputs (
-            ID INTEGER PRIMARY KEY AUTOINCREMENT,
-            TIMESTAMP TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
-            MOTOR1 INTEGER NOT NULL,
-            MOTOR2 INTEGER NOT NULL,
-            MOTOR3 INTEGER NOT NULL,
-            MOTOR4 INTEGER NOT NULL,
-            MOTOR5 INTEGER NOT NULL,
-            MOTOR6 INTEGER NOT NULL,
-            MOTOR7 INTEGER NOT NULL,
-            MOTOR8 INTEGER NOT NULL,
-            S1 INTEGER NOT NULL,
-            S2 INTEGER NOT NULL,
-            S3 INTEGER NOT NULL
-        );
-
-        CREATE TABLE IF NOT EXISTS hydrophone (
-            ID INTEGER PRIMARY KEY AUTOINCREMENT,
-            TIMESTAMP TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
-            HEADING STRING(5) NOT NULL
-        );
-
-        CREATE TABLE IF NOT EXISTS depth (
-            ID INTEGER PRIMARY KEY AUTOINCREMENT,
-            TIMESTAMP TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
-            DEPTH REAL NOT NULL
-        );
-
-        CREATE TABLE IF NOT EXISTS imu (
-            ID INTEGER PRIMARY KEY AUTOINCREMENT,
-            TIMESTAMP TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
-            ACCEL_X REAL NOT NULL,
-            ACCEL_Y REAL NOT NULL,
-            ACCEL_Z REAL NOT NULL,
-            GYRO_X REAL NOT NULL,
-            GYRO_Y REAL NOT NULL,
-            GYRO_Z REAL NOT NULL,
-            MAG_X REAL NOT NULL,
-            MAG_Y REAL NOT NULL,
-            MAG_Z REAL NOT NULL
-        );
-
-        CREATE TABLE IF NOT EXISTS pid_gains (
-            ID INTEGER PRIMARY KEY AUTOINCREMENT,
-            TIMESTAMP TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
-            ROLL_KP REAL NOT NULL,
-            ROLL_KI REAL NOT NULL,
-            ROLL_KD REAL NOT NULL,
-            PITCH_KP REAL NOT NULL,
-            PITCH_KI REAL NOT NULL,
-            PITCH_KD REAL NOT NULL
-        );
-
-        CREATE TABLE IF NOT EXISTS power_safety (
-            ID INTEGER PRIMARY KEY AUTOINCREMENT,
-            TIMESTAMP TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
-            B1_VOLTAGE INTEGER NOT NULL,
-            B2_VOLTAGE INTEGER NOT NULL,
-            B3_VOLTAGE INTEGER NOT NULL,
-            B1_CURRENT INTEGER NOT NULL,
-            B2_CURRENT INTEGER NOT NULL,
-            B3_CURRENT INTEGER NOT NULL,
-            B1_TEMP INTEGER NOT NULL,
-            B2_TEMP INTEGER NOT NULL,
-            B3_TEMP INTEGER NOT NULL
-        );
-
-        CREATE TABLE IF NOT EXISTS detections (
-            ID INTEGER PRIMARY KEY AUTOINCREMENT,
-            TIMESTAMP TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')),
-            CAMERA TEXT NOT NULL,
-            CLASS_NAME TEXT NOT NULL,
-            CONFIDENCE REAL NOT NULL,
-            BBOX_X REAL NOT NULL,
-            BBOX_Y REAL NOT NULL,
-            BBOX_W REAL NOT NULL,
-            BBOX_H REAL NOT NULL,
-            DISTANCE REAL NOT NULL
-        );
-        """
+    # Rows stay plain tuples; schema.TableSpec.to_dict names the columns.
+    # Tables, default UTC timestamps and indexes come from schema.TABLE_SPECS.
+    await dbm.setup()
+
+    writer = GroupCommitWriter(
+        dbm.connection,
+        window_s=float(get_env("AUV_DB_COMMIT_WINDOW_MS", default="5")) / 1000.0,
+        max_batch=int(get_env("AUV_DB_COMMIT_MAX_BATCH", default="500")),
+    )
+    await writer.start()
+
+    readers = ReaderPool(
+        dbm.db_path,
+        size=int(get_env("AUV_DB_READERS", default="4")),
+        pragmas=dbm.pragmas,
+        fallback=dbm.connection,
     )
-    await dbm.connection.commit()
+    await readers.open()
+
+    cache = HotWindowCache(
+        max_rows=int(get_env("AUV_CACHE_ROWS", default="1000")),
+        max_age_s=float(get_env("AUV_CACHE_SECONDS", default="60")),
+    )
+    await cache.warm(dbm.connection, ROUTED)
+
+    retention = RetentionTask(
+        writer, cache, load_rules(ROUTED),
+        interval_s=float(get_env("AUV_RETENTION_INTERVAL_S", default="60")),
+        chunk_rows=int(get_env("AUV_RETENTION_CHUNK_ROWS", default="2000")),
+    )
+    await retention.start(dbm.connection)
 
     app.state.dbm = dbm
+    app.state.writer = writer
+    app.state.readers = readers
+    app.state.cache = cache
+    app.state.retention = retention
+    app.state.broker = RowBroker(
+        queue_size=int(get_env("AUV_STREAM_QUEUE", default="256"))
+    )
+    app.state.sessions = sessions
+    app.state.session_lock = asyncio.Lock()
+    if get_env("AUV_DB_NEW_SESSION", default="0") == "1":
+        await open_session(app, get_env("AUV_DB_SESSION_NAME", default="") or None)
     try:
         yield
     finally:
+        await app.state.retention.stop()
+        await app.state.writer.stop()
+        await app.state.readers.close()
         await app.state.dbm.close()
 
 
-async def get_db(request: Request) -> aiosqlite.Connection:
-    return request.app.state.dbm.connection
\ No newline at end of file
+async def open_session(app: FastAPI, name: Optional[str] = None) -> dict:
+    """
+    Start a new session file and move the whole server onto it.
+
+    The new file is created and set up first. The writer then switches to
+    it between two group commits: rows already queued land in the old
+    session, later ones in the new, and no insert fails meanwhile. The
+    carry-over and a fresh hot-window cache are prepared during the
+    switch, when nothing else is writing. The old readers are closed once
+    their in-flight requests finish.
+    """
+    state = app.state
+    async with state.session_lock:
+        sessions: SessionStore = state.sessions
+        session_id = sessions.new_id(name)
+        dbm = DatabaseManager(sessions.path(session_id), state.dbm.pragmas)
+        await dbm.connect()
+        await dbm.setup()
+        readers = ReaderPool(
+            dbm.db_path, size=state.readers.size, pragmas=dbm.pragmas,
+            fallback=dbm.connection,
+        )
+        await readers.open()
+        cache = HotWindowCache(state.cache.max_rows, state.cache.max_age_s)
+
+        async def prepare(old: aiosqlite.Connection, new: aiosqlite.Connection) -> None:
+            await carry_over(old, new, TABLE_SPECS)
+            await cache.warm(new, ROUTED)
+
+        try:
+            await state.writer.switch(dbm.connection, prepare)
+        except BaseException:
+            await readers.close()
+            await dbm.close()
+            sessions.delete(session_id)
+            raise
+        old_dbm, old_readers = state.dbm, state.readers
+        state.dbm, state.readers, state.cache = dbm, readers, cache
+        state.retention.cache = cache
+        sessions.set_active(session_id)
+
+        await old_readers.close()
+        await old_dbm.close()
+        return sessions.info(session_id)
+
+
+async def get_db(conn: HTTPConnection) -> AsyncIterator[aiosqlite.Connection]:
+    """
+    A read-only connection held for the request. Streaming routes take
+    get_readers instead and acquire one only while they actually read.
+    """
+    async with conn.app.state.readers.acquire() as db:
+        yield db
+
+
+async def get_readers(conn: HTTPConnection) -> ReaderPool:
+    return conn.app.state.readers
+
+
+async def get_writer(conn: HTTPConnection) -> GroupCommitWriter:
+    return conn.app.state.writer
+
+
+async def get_cache(conn: HTTPConnection) -> HotWindowCache:
+    return conn.app.state.cache
+
+
+async def get_broker(conn: HTTPConnection) -> RowBroker:
+    return conn.app.state.broker
+
+
+async def get_retention(conn: HTTPConnection) -> RetentionTask:
+    return conn.app.state.retention
+
+
+async def get_sessions(conn: HTTPConnection) -> SessionStore:
+    return conn.app.state.sessions
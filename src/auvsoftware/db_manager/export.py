@@ -0,0 +1,244 @@
+import csv
+import io
+import struct
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional, Sequence
+
+import aiosqlite
+
+from readers import ReaderPool
+from schema import TableSpec, format_epoch_us
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional: format=arrow is answered with 406
+    pa = None
+
+# Export formats and their media types
+FORMATS = {
+    "npy": "application/octet-stream",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "csv": "text/csv",
+}
+
+# Rows read per query while exporting
+_CHUNK_ROWS = 5000
+
+# NumPy dtype / struct code per SQL column type (fixed-width, little-endian)
+_NPY_TYPES = {"INTEGER": ("<i8", "q"), "REAL": ("<f8", "d"), "BOOLEAN": ("|b1", "?")}
+
+
+def missing_dependency(fmt: str) -> Optional[str]:
+    """Name of the package *fmt* needs that is not installed, if any."""
+    return "pyarrow" if fmt == "arrow" and pa is None else None
+
+
+@dataclass(frozen=True)
+class ExportPlan:
+    """
+    Everything an export needs before the first byte is sent: the row
+    count and, for TEXT columns, the widest value in the range. Exports run
+    in one read snapshot; rows are also bounded by the newest ID at
+    planning time, which keeps them fixed when reads share the writer's
+    connection and no snapshot can be held.
+    """
+    spec: TableSpec
+    start_us: Optional[int]
+    end_us: Optional[int]
+    max_id: int
+    count: int
+    text_widths: dict[str, int]
+
+
+async def plan_export(
+    db: aiosqlite.Connection, spec: TableSpec,
+    start_us: Optional[int], end_us: Optional[int],
+) -> ExportPlan:
+    cur = await db.execute(f"SELECT COALESCE(MAX(ID), 0) FROM {spec.name};")
+    (max_id,) = await cur.fetchone()
+    await cur.close()
+
+    texts = [c.name for c in spec.columns if c.sql_type not in _NPY_TYPES]
+    widths = "".join(f", COALESCE(MAX(LENGTH({t})), 0)" for t in texts)
+    where, args = _range_where(start_us, end_us, max_id)
+    cur = await db.execute(f"SELECT COUNT(*){widths} FROM {spec.name}{where};", args)
+    count, *lengths = await cur.fetchone()
+    await cur.close()
+    # numpy cannot hold a zero-width string field
+    return ExportPlan(
+        spec, start_us, end_us, max_id, count,
+        {t: max(n, 1) for t, n in zip(texts, lengths)},
+    )
+
+
+def _range_where(
+    start_us: Optional[int], end_us: Optional[int], max_id: int
+) -> tuple[str, list]:
+    conds, args = ["ID <= ?"], [max_id]
+    if start_us is not None:
+        conds.append("TS_US >= ?")
+        args.append(start_us)
+    if end_us is not None:
+        conds.append("TS_US <= ?")
+        args.append(end_us)
+    return f" WHERE {' AND '.join(conds)}", args
+
+
+async def _chunks(db: aiosqlite.Connection, plan: ExportPlan) -> AsyncIterator[list]:
+    """
+    Stored rows of the plan in (TS_US, ID) order, a chunk at a time. Each
+    chunk is its own keyset query, so no statement stays open while the
+    writer commits between chunks.
+    """
+    spec = plan.spec
+    where, args = _range_where(plan.start_us, plan.end_us, plan.max_id)
+    sql = (
+        f"{spec.select_sql}{where} AND TS_US >= ? AND (TS_US > ? OR ID > ?) "
+        f"ORDER BY TS_US, ID LIMIT ?;"
+    )
+    last_ts = plan.start_us if plan.start_us is not None else -(1 << 63)
+    last_id = -1
+    while True:
+        cur = await db.execute(sql, [*args, last_ts, last_ts, last_id, _CHUNK_ROWS])
+        rows = await cur.fetchall()
+        await cur.close()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < _CHUNK_ROWS:
+            return
+        last_id, last_ts = rows[-1][0], rows[-1][1]
+
+
+# ----------------------------------------------------------------------
+# Encoders
+# ----------------------------------------------------------------------
+def npy_descr(plan: ExportPlan) -> list[tuple[str, str]]:
+    """Structured dtype of the export: TIMESTAMP is datetime64[us] (UTC)."""
+    descr = [("ID", "<i8"), ("TIMESTAMP", "<M8[us]")]
+    for c in plan.spec.columns:
+        if c.sql_type in _NPY_TYPES:
+            descr.append((c.name, _NPY_TYPES[c.sql_type][0]))
+        else:
+            descr.append((c.name, f"<U{plan.text_widths[c.name]}"))
+    return descr
+
+
+def npy_header(descr: Sequence[tuple[str, str]], count: int) -> bytes:
+    """NPY format 1.0 header for a 1-D structured array of *count* records."""
+    header = repr({"descr": list(descr), "fortran_order": False, "shape": (count,)})
+    # magic (6) + version (2) + length (2) + header, padded to 64 bytes
+    pad = -(10 + len(header) + 1) % 64
+    header = (header + " " * pad + "\n").encode("latin1")
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header
+
+
+async def encode_npy(db: aiosqlite.Connection, plan: ExportPlan) -> AsyncIterator[bytes]:
+    """
+    The export as a .npy file: header, then packed little-endian records.
+    Records need no per-row objects on the client; np.load() or
+    AUVClient.fetch_array() maps the bytes straight into an array.
+    """
+    codes = ["q", "q"]
+    text_cols: list[tuple[int, int]] = []
+    for i, c in enumerate(plan.spec.columns, start=2):
+        if c.sql_type in _NPY_TYPES:
+            codes.append(_NPY_TYPES[c.sql_type][1])
+        else:
+            width = plan.text_widths[c.name]
+            codes.append(f"{4 * width}s")
+            text_cols.append((i, width))
+    pack = struct.Struct("<" + "".join(codes)).pack
+
+    yield npy_header(npy_descr(plan), plan.count)
+    sent = 0
+    async for rows in _chunks(db, plan):
+        if text_cols:
+            rows = [_utf32(r, text_cols) for r in rows]
+        yield b"".join([pack(*r) for r in rows])
+        sent += len(rows)
+    if sent != plan.count:
+        # Rows in the range were deleted mid-export; the header promised
+        # more records than exist, so cut the response short as an error
+        raise RuntimeError(f"{plan.spec.name} export ended after {sent} of {plan.count} rows")
+
+
+def _utf32(row: Sequence, text_cols: Sequence[tuple[int, int]]) -> list:
+    row = list(row)
+    for i, width in text_cols:
+        row[i] = str(row[i]).encode("utf-32-le")[: 4 * width]
+    return row
+
+
+async def encode_csv(db: aiosqlite.Connection, plan: ExportPlan) -> AsyncIterator[bytes]:
+    buf = io.StringIO()
+    out = csv.writer(buf)
+    out.writerow(plan.spec.column_names)
+    async for rows in _chunks(db, plan):
+        out.writerows((r[0], format_epoch_us(r[1]), *r[2:]) for r in rows)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def arrow_schema(spec: TableSpec) -> "pa.Schema":
+    types = {"INTEGER": pa.int64(), "REAL": pa.float64(), "BOOLEAN": pa.bool_()}
+    return pa.schema(
+        [("ID", pa.int64()), ("TIMESTAMP", pa.timestamp("us", tz="UTC"))]
+        + [(c.name, types.get(c.sql_type, pa.string())) for c in spec.columns]
+    )
+
+
+class _Sink:
+    """Write-only file object that hands back what was written since last drained."""
+
+    def __init__(self) -> None:
+        self.parts: list[bytes] = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+
+async def encode_arrow(db: aiosqlite.Connection, plan: ExportPlan) -> AsyncIterator[bytes]:
+    """The export as an Arrow IPC stream, one record batch per chunk."""
+    schema = arrow_schema(plan.spec)
+    sink = _Sink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        yield sink.drain()
+        async for rows in _chunks(db, plan):
+            columns = list(zip(*rows))
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(col, type=f.type) for col, f in zip(columns, schema)],
+                schema=schema,
+            ))
+            yield sink.drain()
+    yield sink.drain()
+
+
+ENCODERS = {"npy": encode_npy, "arrow": encode_arrow, "csv": encode_csv}
+
+
+async def export_stream(
+    readers: ReaderPool, spec: TableSpec, fmt: str,
+    start_us: Optional[int], end_us: Optional[int],
+) -> AsyncIterator[bytes]:
+    """
+    Body of /{table}/export. The reader is acquired when the response
+    starts and released when it ends, and the whole export is read from a
+    single snapshot.
+    """
+    async with readers.snapshot() as db:
+        plan = await plan_export(db, spec, start_us, end_us)
+        async for part in ENCODERS[fmt](db, plan):
+            yield part
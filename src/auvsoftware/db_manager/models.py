@@ -85,6 +85,7 @@ class DetectionsRead(DetectionsCreate):
 # ---- list wrapper (shared) ----
 class ListEnvelope(BaseModel):
     items: list
-    total: int
+    total: Optional[int]   # None when requested with with_total=false
     limit: int
     offset: int
+    next_cursor: Optional[int] = None
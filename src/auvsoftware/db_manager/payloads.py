@@ -0,0 +1,97 @@
+from functools import lru_cache
+from typing import Any, NoReturn
+
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+try:
+    import msgpack
+except ImportError:  # optional: msgpack bodies are answered with 415
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+FORM = "application/x-www-form-urlencoded"
+MULTIPART = "multipart/form-data"
+
+# Accepted aliases for the msgpack media type
+_MSGPACK_TYPES = frozenset([MSGPACK, "application/x-msgpack", "application/vnd.msgpack"])
+
+
+def _media_type(request: Request) -> str:
+    return request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(list[model])
+
+
+def _raise_validation(exc: ValidationError) -> NoReturn:
+    errors = [{**e, "loc": ("body", *e["loc"])} for e in exc.errors()]
+    raise RequestValidationError(errors) from None
+
+
+def _unpack(body: bytes) -> Any:
+    if msgpack is None:
+        raise HTTPException(415, "msgpack is not installed on the server")
+    try:
+        return msgpack.unpackb(body)
+    except Exception as exc:  # noqa: BLE001 - any malformed payload
+        raise HTTPException(400, f"invalid msgpack body: {exc}") from None
+
+
+async def parse_one(request: Request, model: type[BaseModel]) -> BaseModel:
+    """
+    Validate a single-row POST body against *model*. JSON is validated
+    straight from bytes by pydantic-core; msgpack is decoded then validated;
+    form bodies (used by the UI and curl scripts) are still accepted.
+    """
+    media = _media_type(request)
+    try:
+        if media == JSON:
+            return model.model_validate_json(await request.body())
+        if media in _MSGPACK_TYPES:
+            return model.model_validate(_unpack(await request.body()))
+        if media in (FORM, MULTIPART, ""):
+            return model.model_validate(dict(await request.form()))
+    except ValidationError as exc:
+        _raise_validation(exc)
+    raise HTTPException(415, f"unsupported content type: {media}")
+
+
+async def parse_many(request: Request, model: type[BaseModel]) -> list[BaseModel]:
+    """Validate a JSON or msgpack array of rows against *model*."""
+    media = _media_type(request)
+    adapter = _list_adapter(model)
+    try:
+        if media in (JSON, ""):
+            return adapter.validate_json(await request.body())
+        if media in _MSGPACK_TYPES:
+            return adapter.validate_python(_unpack(await request.body()))
+    except ValidationError as exc:
+        _raise_validation(exc)
+    raise HTTPException(415, f"unsupported content type: {media}")
+
+
+def request_body_doc(model: type[BaseModel], many: bool = False) -> dict:
+    """openapi_extra describing the body encodings a POST route accepts."""
+    schema = model.model_json_schema()
+    if many:
+        return {
+            "requestBody": {
+                "required": True,
+                "content": {
+                    JSON: {"schema": {"type": "array", "items": schema}},
+                    MSGPACK: {"schema": {"type": "array", "items": schema}},
+                },
+            }
+        }
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {JSON: {"schema": schema}, MSGPACK: {"schema": schema},
+                        FORM: {"schema": schema}},
+        }
+    }
@@ -0,0 +1,99 @@
+import asyncio
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+import aiosqlite
+
+# Pragmas that are per connection, so they must be repeated on every reader
+READER_PRAGMAS = ("cache_size", "mmap_size", "temp_store")
+
+
+class ReaderPool:
+    """
+    Small pool of read-only connections to the database file.
+
+    In WAL mode readers work from their own snapshot and never wait on the
+    writer, but a single aiosqlite connection still runs its statements one
+    at a time on one thread. Giving reads their own connections keeps a long
+    list scan or export from queueing in front of the writer's inserts.
+
+    With ``size=0`` every read shares *fallback* (the writer's connection),
+    which is also what an in-memory database needs.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        size: int = 4,
+        pragmas: Optional[dict[str, str]] = None,
+        fallback: Optional[aiosqlite.Connection] = None,
+    ) -> None:
+        self.db_path = db_path
+        self.size = size
+        self.pragmas = {k: v for k, v in (pragmas or {}).items() if k in READER_PRAGMAS}
+        self.fallback = fallback
+        self._idle: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        self._all: list[aiosqlite.Connection] = []
+        self.waits = 0
+
+    async def open(self) -> None:
+        if self.size <= 0:
+            return
+        uri = Path(self.db_path).absolute().as_uri() + "?mode=ro"
+        for _ in range(self.size):
+            conn = await aiosqlite.connect(uri, uri=True)
+            await conn.execute("PRAGMA query_only = ON;")
+            for name, value in self.pragmas.items():
+                await conn.execute(f"PRAGMA {name} = {value};")
+            self._all.append(conn)
+            self._idle.put_nowait(conn)
+
+    async def close(self) -> None:
+        """Close every reader once the requests holding one have finished."""
+        for _ in self._all:
+            await self._idle.get()
+        for conn in self._all:
+            await conn.close()
+        self._all.clear()
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[aiosqlite.Connection]:
+        """A reader for the duration of the block; waits if all are busy."""
+        if not self._all:
+            yield self.fallback
+            return
+        if self._idle.empty():
+            self.waits += 1
+        conn = await self._idle.get()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                await conn.rollback()
+            self._idle.put_nowait(conn)
+
+    @asynccontextmanager
+    async def snapshot(self) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        A reader inside one read transaction: every query in the block sees
+        the database as of its first read, whatever commits meanwhile.
+        """
+        async with self.acquire() as conn:
+            if not self._all:
+                # Shared writer connection: a transaction here would swallow
+                # the writer's jobs, so reads see each commit as it lands
+                yield conn
+                return
+            await conn.execute("BEGIN;")
+            try:
+                yield conn
+            finally:
+                await conn.rollback()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._all),
+            "idle": self._idle.qsize(),
+            "waits": self.waits,
+        }
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import aiosqlite
+from config import get_env
+
+from cache import HotWindowCache
+from schema import TableSpec, now_us, parse_width
+from writer import GroupCommitWriter
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RetentionRule:
+    """Delete rows of *table* older than *keep_ms*."""
+    table: str
+    keep_ms: int
+    rollup: bool = False   # rollup tables are keyed by BUCKET (epoch ms)
+
+    def delete_sql(self) -> str:
+        """Delete up to ? rows older than the cutoff, oldest first."""
+        if self.rollup:
+            return (
+                f"DELETE FROM {self.table} WHERE BUCKET IN ("
+                f"SELECT BUCKET FROM {self.table} WHERE BUCKET < ? LIMIT ?);"
+            )
+        return (
+            f"DELETE FROM {self.table} WHERE ID IN ("
+            f"SELECT ID FROM {self.table} WHERE TS_US < ? ORDER BY TS_US LIMIT ?);"
+        )
+
+    def cutoff(self, now: int) -> int:
+        """Oldest key kept at epoch-us *now*: ms for rollups, us for raw tables."""
+        if self.rollup:
+            return now // 1000 - self.keep_ms
+        return now - self.keep_ms * 1000
+
+
+def load_rules(specs: Iterable[TableSpec]) -> list[RetentionRule]:
+    """
+    Rules from AUV_RETAIN_<TABLE> environment variables, e.g.
+    AUV_RETAIN_IMU=24h, AUV_RETAIN_DETECTIONS=7d, AUV_RETAIN_IMU_1S=30d.
+    Tables without a variable keep everything.
+    """
+    rules = []
+    for spec in specs:
+        names = [(spec.name, False)] + [(r.name, True) for r in spec.rollup_tables]
+        for name, rollup in names:
+            value = get_env(f"AUV_RETAIN_{name.upper()}", default="")
+            if not value:
+                continue
+            try:
+                rules.append(RetentionRule(name, parse_width(value), rollup))
+            except ValueError as exc:
+                raise ValueError(f"AUV_RETAIN_{name.upper()}: {exc}") from None
+    return rules
+
+
+class RetentionTask:
+    """
+    Background task enforcing retention rules.
+
+    Every ``interval_s`` it deletes expired rows in chunks of ``chunk_rows``.
+    Each chunk is one short job on the group-commit writer, followed by a
+    pause, so control-path inserts queued behind it wait for at most one
+    chunk. Freed pages are returned to the filesystem with
+    ``PRAGMA incremental_vacuum``, a few hundred pages per job, when the
+    database uses auto_vacuum=INCREMENTAL.
+    """
+
+    def __init__(
+        self,
+        writer: GroupCommitWriter,
+        cache: HotWindowCache,
+        rules: list[RetentionRule],
+        interval_s: float = 60.0,
+        chunk_rows: int = 2000,
+        pause_s: float = 0.05,
+        vacuum_pages: int = 256,
+    ) -> None:
+        self.writer = writer
+        self.cache = cache
+        self.rules = rules
+        self.interval_s = interval_s
+        self.chunk_rows = chunk_rows
+        self.pause_s = pause_s
+        self.vacuum_pages = vacuum_pages
+        self.deleted: dict[str, int] = {r.table: 0 for r in rules}
+        self.vacuumed_pages = 0
+        self.last_pass: Optional[float] = None
+        self._incremental = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, db: aiosqlite.Connection) -> None:
+        if not self.rules:
+            return
+        cur = await db.execute("PRAGMA auto_vacuum;")
+        (mode,) = await cur.fetchone()
+        await cur.close()
+        self._incremental = mode == 2
+        if not self._incremental:
+            log.warning(
+                "auto_vacuum is not INCREMENTAL; expired rows are deleted but the "
+                "file will not shrink (run 'PRAGMA auto_vacuum=INCREMENTAL; VACUUM;' once)"
+            )
+        self._task = asyncio.create_task(self._run(), name="db-retention")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run_once(self) -> None:
+        """Apply every rule once."""
+        now = now_us()
+        for rule in self.rules:
+            await self._expire(rule, rule.cutoff(now))
+        if self._incremental:
+            while await self._vacuum():
+                await asyncio.sleep(self.pause_s)
+        self.last_pass = time.time()
+
+    def stats(self) -> dict:
+        return {
+            "rules": {r.table: r.keep_ms for r in self.rules},
+            "deleted": dict(self.deleted),
+            "vacuumed_pages": self.vacuumed_pages,
+            "last_pass": self.last_pass,
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # noqa: BLE001 - keep enforcing on the next pass
+                log.exception("retention pass failed")
+            await asyncio.sleep(self.interval_s)
+
+    async def _expire(self, rule: RetentionRule, cutoff: int) -> None:
+        sql = rule.delete_sql()
+
+        async def job(db: aiosqlite.Connection) -> int:
+            cur = await db.execute(sql, (cutoff, self.chunk_rows))
+            return cur.rowcount
+
+        while True:
+            deleted = await self.writer.submit(job, single_statement=True)
+            if deleted:
+                self.deleted[rule.table] += deleted
+                if not rule.rollup:
+                    self.cache.expire(rule.table, cutoff, deleted)
+            if deleted < self.chunk_rows:
+                return
+            if self._incremental:
+                await self._vacuum()
+            await asyncio.sleep(self.pause_s)
+
+    async def _vacuum(self) -> int:
+        """Release up to vacuum_pages free pages; returns how many were freed."""
+        async def job(db: aiosqlite.Connection) -> int:
+            cur = await db.execute("PRAGMA freelist_count;")
+            (free,) = await cur.fetchone()
+            await cur.close()
+            pages = min(free, self.vacuum_pages)
+            if pages:
+                # Each execution of the pragma frees one page when stepped
+                # through the sqlite3 module, so repeat it in a single call.
+                await db.executemany("PRAGMA incremental_vacuum(1);", [()] * pages)
+            return pages
+
+        pages = await self.writer.submit(job)
+        self.vacuumed_pages += pages
+        return pages
@@ -1,381 +1,756 @@
-from datetime import datetime, timezone
-from typing import Optional, Sequence
+import asyncio
+import json
+import os
+from typing import Any, AsyncIterator, Optional, Sequence
 
 import aiosqlite
-from fastapi import APIRouter, Depends, Form, HTTPException, Query
-
-from deps import get_db
+from fastapi import (
+    APIRouter, Depends, Header, HTTPException, Query, Request, Response,
+    WebSocket, WebSocketDisconnect,
+)
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel
+
+from broker import RowBroker
+from cache import HotWindowCache
+from deps import (
+    get_broker, get_cache, get_db, get_readers, get_retention, get_sessions,
+    get_writer, open_session,
+)
+from export import FORMATS, export_stream, missing_dependency
+from payloads import parse_many, parse_one, request_body_doc
+from readers import ReaderPool
+from retention import RetentionTask
+from schema import (
+    ROUTED, Rollup, TableSpec, format_epoch_us, now_us, parse_epoch_us, parse_width,
+)
+from sessions import SessionStore
+from writer import GroupCommitWriter
 
 router = APIRouter()
 
+# Upper bound on rows accepted by a single /{table}/batch request
+_MAX_BATCH = 5000
+# Idle streams send a keepalive this often so proxies and clients can tell
+# a quiet table from a dead connection
+_KEEPALIVE_S = 15.0
+# Most rows replayed to a stream resuming from a known ID
+_REPLAY_MAX = 5000
+# Most buckets returned by one /aggregate request
+_MAX_BUCKETS = 10000
+# Most rows per table returned by /snapshot (table:n)
+_SNAPSHOT_MAX_ROWS = 500
+
+_ROUTED_BY_NAME = {s.name: s for s in ROUTED}
+
+
+class RowJSONResponse(Response):
+    """
+    JSON response for rows that are already plain dicts of str/int/float.
+    Skips FastAPI's jsonable_encoder walk and encodes compactly in one call.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return json.dumps(content, separators=(",", ":")).encode("utf-8")
+
 
 # ----------------------------------------------------------------------
 # Helpers
 # ----------------------------------------------------------------------
+def _parse_time(name: str, text: Optional[str]) -> Optional[int]:
+    """Query-string ISO-8601 time -> epoch microseconds (400 if malformed)."""
+    if text is None:
+        return None
+    try:
+        return parse_epoch_us(text)
+    except ValueError:
+        raise HTTPException(400, f"{name}: not an ISO-8601 timestamp: {text!r}") from None
+
+def _row_values(spec: TableSpec, item: BaseModel, stamp_us: int) -> tuple:
+    try:
+        return spec.values(item, stamp_us)
+    except ValueError:
+        raise HTTPException(
+            422, f"TIMESTAMP: not an ISO-8601 timestamp: {item.TIMESTAMP!r}"
+        ) from None
+
 async def _insert_and_fetch(
-    db: aiosqlite.Connection, table: str, cols: Sequence[str], values: Sequence
+    writer: GroupCommitWriter, cache: HotWindowCache, broker: RowBroker,
+    spec: TableSpec, item: BaseModel,
 ) -> dict:
-    placeholders = ",".join(["?"] * len(cols))
-    cur = await db.execute(
-        f"INSERT INTO {table} ({','.join(cols)}) VALUES ({placeholders});",
-        values,
-    )
-    row_id = cur.lastrowid
-    await db.commit()
-    cur = await db.execute(f"SELECT * FROM {table} WHERE ID = ?;", (row_id,))
+    values = _row_values(spec, item, now_us())
+
+    async def job(db: aiosqlite.Connection) -> int:
+        cur = await db.execute(spec.insert_sql, values)
+        return cur.lastrowid
+
+    # Returns once the writer's group containing this insert has committed.
+    # One statement per insert: the echoed row is built from the validated
+    # values instead of being read back with a second SELECT.
+    row = spec.inserted(await writer.submit(job, single_statement=True), values)
+    cache.add(spec.name, values[0], row)
+    broker.publish(spec.name, (row,))
+    return row
+
+async def _insert_batch(
+    writer: GroupCommitWriter, cache: HotWindowCache, broker: RowBroker,
+    spec: TableSpec, rows: Sequence[BaseModel],
+) -> dict:
+    """
+    Insert every row with one executemany inside the writer's transaction.
+    Rows without a TIMESTAMP are stamped with the time the batch arrived.
+    """
+    if not rows:
+        return {"inserted": 0, "first_id": None, "last_id": None}
+    if len(rows) > _MAX_BATCH:
+        raise HTTPException(413, f"batch exceeds {_MAX_BATCH} rows")
+
+    stamp = now_us()
+    values = [_row_values(spec, r, stamp) for r in rows]
+
+    async def job(db: aiosqlite.Connection) -> int:
+        await db.executemany(spec.insert_sql, values)
+        cur = await db.execute("SELECT last_insert_rowid();")
+        (last_id,) = await cur.fetchone()
+        await cur.close()
+        return last_id
+
+    last_id = await writer.submit(job)
+    # IDs are contiguous: one writer, one transaction, AUTOINCREMENT keys
+    first_id = last_id - len(values) + 1
+    inserted = [spec.inserted(first_id + i, v) for i, v in enumerate(values)]
+    cache.add_many(spec.name, ((v[0], r) for v, r in zip(values, inserted)))
+    broker.publish(spec.name, inserted)
+    return {"inserted": len(values), "first_id": first_id, "last_id": last_id}
+
+async def _get_by_id(db: aiosqlite.Connection, spec: TableSpec, id_: int) -> dict | None:
+    cur = await db.execute(spec.select_by_id_sql, (id_,))
     row = await cur.fetchone()
     await cur.close()
-    return dict(row)
-
-async def _get_by_id(db: aiosqlite.Connection, table: str, id_: int) -> dict | None:
-    cur = await db.execute(f"SELECT * FROM {table} WHERE ID = ?;", (id_,))
+    return spec.to_dict(row) if row else None
+
+async def _delete_by_id(
+    writer: GroupCommitWriter, cache: HotWindowCache, spec: TableSpec, id_: int
+) -> int:
+    async def job(db: aiosqlite.Connection) -> int:
+        cur = await db.execute(spec.delete_by_id_sql, (id_,))
+        return cur.rowcount
+
+    deleted = await writer.submit(job, single_statement=True)
+    if deleted:
+        cache.discard(spec.name, id_)
+    return deleted
+
+async def _latest(
+    db: aiosqlite.Connection, cache: HotWindowCache, spec: TableSpec
+) -> dict | None:
+    hit, row = cache.latest(spec.name)
+    if hit:
+        return row
+    cur = await db.execute(spec.latest_sql)
     row = await cur.fetchone()
     await cur.close()
-    return dict(row) if row else None
+    return spec.to_dict(row) if row else None
 
-async def _delete_by_id(db: aiosqlite.Connection, table: str, id_: int) -> int:
-    cur = await db.execute(f"DELETE FROM {table} WHERE ID = ?;", (id_,))
-    await db.commit()
-    return cur.rowcount
+async def _cursor_ts(db: aiosqlite.Connection, spec: TableSpec, id_: int) -> Optional[int]:
+    """TS_US of the cursor row, or of the nearest row below it by ID if the
+    cursor row was deleted; None if there is none."""
+    cur = await db.execute(
+        f"SELECT TS_US FROM {spec.name} WHERE ID <= ? ORDER BY ID DESC LIMIT 1;",
+        (id_,),
+    )
+    row = await cur.fetchone()
+    await cur.close()
+    return row[0] if row else None
 
 async def _list_by_time(
-    db: aiosqlite.Connection, table: str, ts_col: str,
-    limit: int, offset: int, start: Optional[str], end: Optional[str]
-) -> tuple[list[dict], int]:
-    args: list = []
-    if start and end:
-        where = f" WHERE {ts_col} BETWEEN ? AND ?"
-        args = [start, end]
-    elif start:
-        where = f" WHERE {ts_col} >= ?"
-        args = [start]
-    elif end:
-        where = f" WHERE {ts_col} <= ?"
-        args = [end]
-    else:
-        where = ""
+    db: aiosqlite.Connection, cache: HotWindowCache, spec: TableSpec, ts_col: str,
+    limit: int, offset: int, start_us: Optional[int], end_us: Optional[int],
+    before_id: Optional[int] = None, after_id: Optional[int] = None,
+    with_total: bool = True,
+) -> tuple[list[dict], Optional[int]]:
+    """
+    One page of rows, newest first; oldest first when *after_id* is given.
+
+    Cursors are keyset bounds rather than OFFSETs: the cursor row's TS_US
+    becomes an index bound and (TS_US, ID) breaks ties, so a page deep
+    into the table costs the same index seek as the first one. Unfiltered
+    totals come from the cache's running counts; filtered totals need a
+    COUNT(*) and are only computed when *with_total* is set.
+    """
+    cached = cache.window(
+        spec.name, limit, offset, start_us, end_us, before_id, after_id, with_total
+    )
+    if cached is not None:
+        return cached
 
-    cur = await db.execute(f"SELECT COUNT(*) FROM {table}{where};", args)
-    (total,) = await cur.fetchone()
-    await cur.close()
+    lo, hi = start_us, end_us
+    conds: list[str] = []
+    args: list = []
+    if before_id is not None:
+        ts = await _cursor_ts(db, spec, before_id)
+        if ts is None:
+            total = await _count(db, cache, spec, ts_col, start_us, end_us) if with_total else None
+            return [], total
+        hi = ts if hi is None else min(hi, ts)
+        conds.append(f"({ts_col} < ? OR ID < ?)")
+        args += [ts, before_id]
+    if after_id is not None:
+        ts = await _cursor_ts(db, spec, after_id)
+        if ts is not None:
+            lo = ts if lo is None else max(lo, ts)
+            conds.append(f"({ts_col} > ? OR ID > ?)")
+            args += [ts, after_id]
+
+    bounds: list[str] = []
+    bound_args: list = []
+    if lo is not None:
+        bounds.append(f"{ts_col} >= ?")
+        bound_args.append(lo)
+    if hi is not None:
+        bounds.append(f"{ts_col} <= ?")
+        bound_args.append(hi)
+    where = " AND ".join(bounds + conds)
+    where = f" WHERE {where}" if where else ""
+    order = "ASC" if after_id is not None else "DESC"
 
     cur = await db.execute(
-        f"SELECT * FROM {table}{where} ORDER BY {ts_col} DESC LIMIT ? OFFSET ?;",
-        [*args, limit, offset],
+        f"{spec.select_sql}{where} ORDER BY {ts_col} {order}, ID {order} LIMIT ? OFFSET ?;",
+        [*bound_args, *args, limit, offset],
     )
-    rows = [dict(r) for r in await cur.fetchall()]
+    rows = [spec.to_dict(r) for r in await cur.fetchall()]
     await cur.close()
+    total = await _count(db, cache, spec, ts_col, start_us, end_us) if with_total else None
     return rows, total
 
-
-# ----------------------------------------------------------------------
-# inputs
-#   NOTE: order matters: define /latest BEFORE /{id}
-# ----------------------------------------------------------------------
-@router.post("/inputs", tags=["inputs"])
-async def create_inputs(
-    SURGE: int = Form(...), SWAY: int = Form(...), HEAVE: int = Form(...),
-    ROLL: int = Form(...), PITCH: int = Form(...), YAW: int = Form(...),
-    S1: int = Form(...), S2: int = Form(...), S3: int = Form(...),
-    db: aiosqlite.Connection = Depends(get_db),
-):
-    cols = ["SURGE", "SWAY", "HEAVE", "ROLL", "PITCH", "YAW", "S1", "S2", "S3"]
-    vals = [SURGE, SWAY, HEAVE, ROLL, PITCH, YAW, S1, S2, S3]
-    return await _insert_and_fetch(db, "inputs", cols, vals)
-
-@router.get("/inputs", tags=["inputs"])
-async def list_inputs(
-    limit: int = Query(50, ge=1, le=500),
-    offset: int = Query(0, ge=0),
-    start: Optional[str] = None,
-    end: Optional[str] = None,
-    db: aiosqlite.Connection = Depends(get_db),
-):
-    rows, total = await _list_by_time(db, "inputs", "TIMESTAMP", limit, offset, start, end)
-    return {"items": rows, "total": total, "limit": limit, "offset": offset}
-
-@router.get("/inputs/latest", tags=["inputs"])
-async def latest_inputs(db: aiosqlite.Connection = Depends(get_db)):
-    cur = await db.execute("SELECT * FROM inputs ORDER BY TIMESTAMP DESC LIMIT 1;")
-    row = await cur.fetchone()
+def _time_where(
+    ts_col: str, start_us: Optional[int], end_us: Optional[int]
+) -> tuple[str, list]:
+    """WHERE clause (or "") and its args for an optional TS_US range."""
+    if start_us is not None and end_us is not None:
+        return f" WHERE {ts_col} BETWEEN ? AND ?", [start_us, end_us]
+    if start_us is not None:
+        return f" WHERE {ts_col} >= ?", [start_us]
+    if end_us is not None:
+        return f" WHERE {ts_col} <= ?", [end_us]
+    return "", []
+
+async def _count(
+    db: aiosqlite.Connection, cache: HotWindowCache, spec: TableSpec, ts_col: str,
+    start_us: Optional[int], end_us: Optional[int],
+) -> int:
+    if start_us is None and end_us is None:
+        known = cache.count(spec.name)
+        if known is not None:
+            return known
+    where, args = _time_where(ts_col, start_us, end_us)
+    cur = await db.execute(f"SELECT COUNT(*) FROM {spec.name}{where};", args)
+    (total,) = await cur.fetchone()
+    await cur.close()
+    return total
+
+def _parse_bucket(bucket: str) -> int:
+    try:
+        return parse_width(bucket)
+    except ValueError as exc:
+        raise HTTPException(400, f"bucket: {exc}") from None
+
+def _parse_fields(spec: TableSpec, fields: Optional[str]) -> tuple[str, ...]:
+    if not fields:
+        return spec.numeric_columns
+    names = tuple(dict.fromkeys(f.strip().upper() for f in fields.split(",") if f.strip()))
+    unknown = [n for n in names if n not in spec.numeric_columns]
+    if unknown or not names:
+        raise HTTPException(
+            400, f"fields must be numeric columns of {spec.name}: {list(spec.numeric_columns)}"
+        )
+    return names
+
+async def _partials(
+    db: aiosqlite.Connection, sql: str, args: list, acc: dict[int, list],
+) -> None:
+    """
+    Fold rows of (bucket, count, min, max, sum, min, max, sum, ...) into
+    *acc*, combining buckets that several queries contribute to.
+    """
+    cur = await db.execute(sql, [*args, _MAX_BUCKETS + 1])
+    for bucket, n, *stats in await cur.fetchall():
+        into = acc.get(bucket)
+        if into is None:
+            acc[bucket] = [n, *stats]
+            continue
+        into[0] += n
+        for i in range(0, len(stats), 3):
+            lo, hi, total = stats[i:i + 3]
+            into[1 + i] = min(into[1 + i], lo)
+            into[2 + i] = max(into[2 + i], hi)
+            into[3 + i] += total
     await cur.close()
-    return dict(row) if row else None
-
-@router.get("/inputs/{id}", tags=["inputs"])
-async def get_inputs(id: int, db: aiosqlite.Connection = Depends(get_db)):
-    row = await _get_by_id(db, "inputs", id)
-    if not row:
-        raise HTTPException(404, "inputs not found")
-    return row
 
-@router.delete("/inputs/{id}", status_code=204, tags=["inputs"])
-async def delete_inputs(id: int, db: aiosqlite.Connection = Depends(get_db)):
-    if await _delete_by_id(db, "inputs", id) == 0:
-        raise HTTPException(404, "inputs not found")
+async def _aggregate(
+    db: aiosqlite.Connection, spec: TableSpec, bucket_ms: int,
+    fields: Sequence[str], start_us: Optional[int], end_us: Optional[int],
+) -> tuple[list[dict], str]:
+    """
+    count and min/max/mean of *fields* per *bucket_ms* window. Buckets
+    without rows are omitted. Returns (buckets, source).
+
+    When a rollup tiles the bucket width, every whole rollup bucket inside
+    [start, end] is read from the rollup and only the partial buckets at
+    the edges of the range are aggregated from raw rows, so the cost stays
+    flat however much raw data the range spans.
+    """
+    raw_aggs = ", ".join(f"MIN({f}), MAX({f}), SUM({f})" for f in fields)
+    raw_sql = (
+        f"SELECT TS_US / {bucket_ms * 1000} AS bucket, COUNT(*), {raw_aggs} "
+        f"FROM {spec.name}{{where}} GROUP BY bucket LIMIT ?;"
+    )
+    acc: dict[int, list] = {}
+
+    rollup = spec.rollup_for(bucket_ms)
+    span = _rollup_span(rollup, start_us, end_us) if rollup else None
+    if span is None:
+        where, args = _time_where("TS_US", start_us, end_us)
+        await _partials(db, raw_sql.format(where=where), args, acc)
+        source = "raw"
+    else:
+        lo, hi = span
+        conds, args = [], []
+        if lo is not None:
+            conds.append("BUCKET >= ?")
+            args.append(lo)
+        if hi is not None:
+            conds.append("BUCKET < ?")
+            args.append(hi)
+        where = f" WHERE {' AND '.join(conds)}" if conds else ""
+        roll_aggs = ", ".join(f"MIN({f}_MIN), MAX({f}_MAX), SUM({f}_SUM)" for f in fields)
+        await _partials(
+            db,
+            f"SELECT BUCKET / {bucket_ms} AS bucket, SUM(N), {roll_aggs} "
+            f"FROM {rollup.name}{where} GROUP BY bucket LIMIT ?;",
+            args, acc,
+        )
+        # Raw rows in the partial rollup buckets at either end of the range
+        if lo is not None and start_us is not None:
+            await _partials(
+                db, raw_sql.format(where=" WHERE TS_US >= ? AND TS_US < ?"),
+                [start_us, lo * 1000], acc,
+            )
+        if hi is not None and end_us is not None:
+            await _partials(
+                db, raw_sql.format(where=" WHERE TS_US >= ? AND TS_US <= ?"),
+                [hi * 1000, end_us], acc,
+            )
+        source = rollup.name
+
+    if len(acc) > _MAX_BUCKETS:
+        raise HTTPException(
+            400, f"more than {_MAX_BUCKETS} buckets; use a wider bucket or range"
+        )
+    buckets = []
+    for bucket in sorted(acc):
+        n, *stats = acc[bucket]
+        item = {"start": format_epoch_us(bucket * bucket_ms * 1000), "count": n}
+        for i, f in enumerate(fields):
+            lo_, hi_, total = stats[3 * i: 3 * i + 3]
+            item[f] = {"min": lo_, "max": hi_, "mean": total / n}
+        buckets.append(item)
+    return buckets, source
+
+def _rollup_span(
+    rollup: Rollup, start_us: Optional[int], end_us: Optional[int]
+) -> Optional[tuple[Optional[int], Optional[int]]]:
+    """
+    [lo, hi) epoch-ms bounds of the whole *rollup* buckets inside
+    [start, end]; None means no whole bucket fits and the query should read
+    raw rows only.
+    """
+    width_us = rollup.width_ms * 1000
+    lo = None if start_us is None else -(-start_us // width_us) * rollup.width_ms
+    hi = None if end_us is None else (end_us + 1) // width_us * rollup.width_ms
+    if lo is not None and hi is not None and lo >= hi:
+        return None
+    return lo, hi
+
+async def _follow(
+    readers: ReaderPool, cache: HotWindowCache, broker: RowBroker,
+    spec: TableSpec, after_id: Optional[int], latest: bool,
+) -> AsyncIterator[Optional[dict]]:
+    """
+    Rows of *spec* as they are committed, oldest first. Starts with the rows
+    after *after_id* (a resuming client) or else the current latest row, then
+    follows the broker. Yields None after each idle keepalive period. A
+    reader is held only for the initial read, never while following.
+    """
+    with broker.subscribe(spec.name) as queue:
+        # Subscribed before reading, so nothing committed meanwhile is lost;
+        # rows seen in both the replay and the queue are skipped by ID.
+        last_id = 0
+        replay: list[dict] = []
+        if after_id is not None:
+            async with readers.acquire() as db:
+                cur = await db.execute(
+                    f"{spec.select_sql} WHERE ID > ? ORDER BY ID LIMIT ?;",
+                    (after_id, _REPLAY_MAX),
+                )
+                replay = [spec.to_dict(r) for r in await cur.fetchall()]
+                await cur.close()
+        elif latest:
+            async with readers.acquire() as db:
+                row = await _latest(db, cache, spec)
+            replay = [row] if row is not None else []
+        for row in replay:
+            last_id = row["ID"]
+            yield row
+
+        while True:
+            try:
+                row = await asyncio.wait_for(queue.get(), _KEEPALIVE_S)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if row["ID"] > last_id:
+                last_id = row["ID"]
+                yield row
+
+
+def _parse_snapshot_tables(tables: Optional[str]) -> dict[str, Optional[int]]:
+    """
+    'depth,imu,detections:8' -> {table: None for the latest row, or n for
+    the newest n rows}. No tables means the latest row of every table.
+    """
+    if not tables:
+        return {name: None for name in _ROUTED_BY_NAME}
+    wanted: dict[str, Optional[int]] = {}
+    for item in tables.split(","):
+        name, _, n = item.strip().partition(":")
+        if not name:
+            continue
+        if name not in _ROUTED_BY_NAME:
+            raise HTTPException(
+                400, f"tables: unknown table {name!r}; valid: {sorted(_ROUTED_BY_NAME)}"
+            )
+        if not n:
+            wanted[name] = None
+        elif n.isdigit() and 1 <= int(n) <= _SNAPSHOT_MAX_ROWS:
+            wanted[name] = int(n)
+        else:
+            raise HTTPException(
+                400, f"tables: {item.strip()!r}: row count must be 1-{_SNAPSHOT_MAX_ROWS}"
+            )
+    return wanted
+
+async def _snapshot(
+    readers: ReaderPool, wanted: dict[str, Optional[int]]
+) -> dict[str, Any]:
+    """
+    Latest row (or newest n rows) of each table, all read inside one read
+    transaction, so no table is seen at a later commit than another.
+    """
+    out: dict[str, Any] = {}
+    async with readers.snapshot() as db:
+        for name, n in wanted.items():
+            spec = _ROUTED_BY_NAME[name]
+            if n is None:
+                cur = await db.execute(spec.latest_sql)
+                row = await cur.fetchone()
+                out[name] = spec.to_dict(row) if row else None
+            else:
+                cur = await db.execute(
+                    f"{spec.select_sql} ORDER BY TS_US DESC, ID DESC LIMIT ?;", (n,)
+                )
+                out[name] = [spec.to_dict(r) for r in await cur.fetchall()]
+            await cur.close()
+    return out
 
 
 # ----------------------------------------------------------------------
-# outputs
+# snapshot
 # ----------------------------------------------------------------------
-@router.post("/outputs", tags=["outputs"])
-async def create_outputs(
-    MOTOR1: int = Form(...), MOTOR2: int = Form(...), MOTOR3: int = Form(...), MOTOR4: int = Form(...),
-    MOTOR5: int = Form(...), MOTOR6: int = Form(...), MOTOR7: int = Form(...), MOTOR8: int = Form(...),
-    S1: int = Form(...), S2: int = Form(...), S3: int = Form(...),
-    db: aiosqlite.Connection = Depends(get_db),
+@router.get("/snapshot", tags=["snapshot"])
+async def snapshot(
+    tables: Optional[str] = Query(
+        None, description="Comma-separated tables; table:n for its newest n rows",
+    ),
+    readers: ReaderPool = Depends(get_readers),
 ):
-    cols = ["MOTOR1", "MOTOR2", "MOTOR3", "MOTOR4", "MOTOR5", "MOTOR6", "MOTOR7", "MOTOR8", "S1", "S2", "S3"]
-    vals = [MOTOR1, MOTOR2, MOTOR3, MOTOR4, MOTOR5, MOTOR6, MOTOR7, MOTOR8, S1, S2, S3]
-    return await _insert_and_fetch(db, "outputs", cols, vals)
-
-@router.get("/outputs", tags=["outputs"])
-async def list_outputs(
-    limit: int = Query(50, ge=1, le=500),
-    offset: int = Query(0, ge=0),
-    start: Optional[str] = None,
-    end: Optional[str] = None,
-    db: aiosqlite.Connection = Depends(get_db),
-):
-    rows, total = await _list_by_time(db, "outputs", "TIMESTAMP", limit, offset, start, end)
-    return {"items": rows, "total": total, "limit": limit, "offset": offset}
+    return RowJSONResponse(await _snapshot(readers, _parse_snapshot_tables(tables)))
 
-@router.get("/outputs/latest", tags=["outputs"])
-async def latest_outputs(db: aiosqlite.Connection = Depends(get_db)):
-    cur = await db.execute("SELECT * FROM outputs ORDER BY TIMESTAMP DESC LIMIT 1;")
-    row = await cur.fetchone()
-    await cur.close()
-    return dict(row) if row else None
-
-@router.get("/outputs/{id}", tags=["outputs"])
-async def get_outputs(id: int, db: aiosqlite.Connection = Depends(get_db)):
-    row = await _get_by_id(db, "outputs", id)
-    if not row:
-        raise HTTPException(404, "outputs not found")
-    return row
 
-@router.delete("/outputs/{id}", status_code=204, tags=["outputs"])
-async def delete_outputs(id: int, db: aiosqlite.Connection = Depends(get_db)):
-    if await _delete_by_id(db, "outputs", id) == 0:
-        raise HTTPException(404, "outputs not found")
+def _session_path(sessions: SessionStore, session_id: str) -> str:
+    if not sessions.exists(session_id):
+        raise HTTPException(404, f"session {session_id!r} not found")
+    return sessions.path(session_id)
 
 
 # ----------------------------------------------------------------------
-# pid_gains
+# sessions
 # ----------------------------------------------------------------------
-@router.post("/pid_gains", tags=["pid_gains"])
-async def create_pid_gains(
-    ROLL_KP:  float = Form(...), ROLL_KI:  float = Form(...), ROLL_KD:  float = Form(...),
-    PITCH_KP: float = Form(...), PITCH_KI: float = Form(...), PITCH_KD: float = Form(...),
-    db: aiosqlite.Connection = Depends(get_db),
-):
-    cols = ["ROLL_KP", "ROLL_KI", "ROLL_KD", "PITCH_KP", "PITCH_KI", "PITCH_KD"]
-    vals = [ROLL_KP, ROLL_KI, ROLL_KD, PITCH_KP, PITCH_KI, PITCH_KD]
-    return await _insert_and_fetch(db, "pid_gains", cols, vals)
+@router.get("/sessions", tags=["sessions"])
+async def list_sessions(sessions: SessionStore = Depends(get_sessions)):
+    return {"active": sessions.active, "sessions": sessions.list()}
 
-@router.get("/pid_gains/latest", tags=["pid_gains"])
-async def latest_pid_gains(db: aiosqlite.Connection = Depends(get_db)):
-    cur = await db.execute(
-        "SELECT * FROM pid_gains ORDER BY TIMESTAMP DESC LIMIT 1;"
-    )
-    row = await cur.fetchone()
-    await cur.close()
-    return dict(row) if row else None
 
-@router.get("/pid_gains/{id}", tags=["pid_gains"])
-async def get_pid_gains(id: int, db: aiosqlite.Connection = Depends(get_db)):
-    row = await _get_by_id(db, "pid_gains", id)
-    if not row:
-        raise HTTPException(404, "pid_gains not found")
-    return row
+@router.post("/sessions", tags=["sessions"])
+async def new_session(
+    request: Request,
+    name: Optional[str] = Query(None, description="Label appended to the session ID"),
+):
+    return await open_session(request.app, name)
 
 
-# ----------------------------------------------------------------------
-# depth
-# ----------------------------------------------------------------------
-@router.post("/depth", tags=["depth"])
-async def create_depth(
-    DEPTH: float = Form(...),
-    db: aiosqlite.Connection = Depends(get_db),
+@router.get("/sessions/{session_id}/file", tags=["sessions"])
+async def download_session(
+    session_id: str, sessions: SessionStore = Depends(get_sessions)
 ):
-    cols = ["DEPTH"]
-    vals = [DEPTH]
-    return await _insert_and_fetch(db, "depth", cols, vals)
-
-@router.get("/depth", tags=["depth"])
-async def list_depth(
-    limit: int = Query(50, ge=1, le=500),
-    offset: int = Query(0, ge=0),
-    start: Optional[str] = None,
-    end: Optional[str] = None,
-    db: aiosqlite.Connection = Depends(get_db),
-):
-    rows, total = await _list_by_time(db, "depth", "TIMESTAMP", limit, offset, start, end)
-    return {"items": rows, "total": total, "limit": limit, "offset": offset}
-
-@router.get("/depth/latest", tags=["depth"])
-async def latest_depth(db: aiosqlite.Connection = Depends(get_db)):
-    cur = await db.execute("SELECT * FROM depth ORDER BY TIMESTAMP DESC LIMIT 1;")
-    row = await cur.fetchone()
-    await cur.close()
-    return dict(row) if row else None
+    """The session's SQLite file, as is. The active session is still being written."""
+    path = _session_path(sessions, session_id)
+    if session_id == sessions.active:
+        raise HTTPException(409, "session is active; open a new session first")
+    if os.path.exists(path + "-wal"):
+        # Left behind by an unclean shutdown: fold it into the main file
+        async with aiosqlite.connect(path) as db:
+            await db.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+    return FileResponse(
+        path, media_type="application/vnd.sqlite3", filename=f"{session_id}.db"
+    )
 
-@router.get("/depth/{id}", tags=["depth"])
-async def get_depth(id: int, db: aiosqlite.Connection = Depends(get_db)):
-    row = await _get_by_id(db, "depth", id)
-    if not row:
-        raise HTTPException(404, "depth not found")
-    return row
 
-@router.delete("/depth/{id}", status_code=204, tags=["depth"])
-async def delete_depth(id: int, db: aiosqlite.Connection = Depends(get_db)):
-    if await _delete_by_id(db, "depth", id) == 0:
-        raise HTTPException(404, "depth not found")
+@router.delete("/sessions/{session_id}", status_code=204, tags=["sessions"])
+async def delete_session(
+    session_id: str, sessions: SessionStore = Depends(get_sessions)
+):
+    _session_path(sessions, session_id)
+    if session_id == sessions.active:
+        raise HTTPException(409, "session is active; open a new session first")
+    sessions.delete(session_id)
+    return Response(status_code=204)
 
 
 # ----------------------------------------------------------------------
-# imu
+# cache
 # ----------------------------------------------------------------------
-@router.post("/imu", tags=["imu"])
-async def create_imu(
-    ACCEL_X: float = Form(...), ACCEL_Y: float = Form(...), ACCEL_Z: float = Form(...),
-    GYRO_X: float = Form(...),  GYRO_Y: float = Form(...),  GYRO_Z: float = Form(...),
-    MAG_X: float = Form(...),   MAG_Y: float = Form(...),   MAG_Z: float = Form(...),
-    db: aiosqlite.Connection = Depends(get_db),
-):
-    cols = ["ACCEL_X", "ACCEL_Y", "ACCEL_Z", "GYRO_X", "GYRO_Y", "GYRO_Z", "MAG_X", "MAG_Y", "MAG_Z"]
-    vals = [ACCEL_X, ACCEL_Y, ACCEL_Z, GYRO_X, GYRO_Y, GYRO_Z, MAG_X, MAG_Y, MAG_Z]
-    return await _insert_and_fetch(db, "imu", cols, vals)
-
-@router.get("/imu", tags=["imu"])
-async def list_imu(
-    limit: int = Query(50, ge=1, le=500),
-    offset: int = Query(0, ge=0),
-    start: Optional[str] = None,
-    end: Optional[str] = None,
-    db: aiosqlite.Connection = Depends(get_db),
-):
-    rows, total = await _list_by_time(db, "imu", "TIMESTAMP", limit, offset, start, end)
-    return {"items": rows, "total": total, "limit": limit, "offset": offset}
+@router.get("/cache/stats", tags=["cache"])
+async def cache_stats(cache: HotWindowCache = Depends(get_cache)):
+    return cache.stats()
 
-@router.get("/imu/latest", tags=["imu"])
-async def latest_imu(db: aiosqlite.Connection = Depends(get_db)):
-    cur = await db.execute("SELECT * FROM imu ORDER BY TIMESTAMP DESC LIMIT 1;")
-    row = await cur.fetchone()
-    await cur.close()
-    return dict(row) if row else None
 
-@router.get("/imu/{id}", tags=["imu"])
-async def get_imu(id: int, db: aiosqlite.Connection = Depends(get_db)):
-    row = await _get_by_id(db, "imu", id)
-    if not row:
-        raise HTTPException(404, "imu not found")
-    return row
+@router.get("/readers/stats", tags=["readers"])
+async def reader_stats(readers: ReaderPool = Depends(get_readers)):
+    return readers.stats()
 
-@router.delete("/imu/{id}", status_code=204, tags=["imu"])
-async def delete_imu(id: int, db: aiosqlite.Connection = Depends(get_db)):
-    if await _delete_by_id(db, "imu", id) == 0:
-        raise HTTPException(404, "imu not found")
 
+@router.get("/retention/stats", tags=["retention"])
+async def retention_stats(retention: RetentionTask = Depends(get_retention)):
+    return retention.stats()
 
-# ----------------------------------------------------------------------
-# power_safety
-# ----------------------------------------------------------------------
-@router.post("/power_safety", tags=["power_safety"])
-async def create_power_safety(
-    B1_VOLTAGE: int = Form(...), B2_VOLTAGE: int = Form(...), B3_VOLTAGE: int = Form(...),
-    B1_CURRENT: int = Form(...), B2_CURRENT: int = Form(...), B3_CURRENT: int = Form(...),
-    B1_TEMP: int = Form(...),    B2_TEMP: int = Form(...),    B3_TEMP: int = Form(...),
-    db: aiosqlite.Connection = Depends(get_db),
-):
-    cols = [
-        "B1_VOLTAGE", "B2_VOLTAGE", "B3_VOLTAGE",
-        "B1_CURRENT", "B2_CURRENT", "B3_CURRENT",
-        "B1_TEMP", "B2_TEMP", "B3_TEMP"
-    ]
-    vals = [
-        B1_VOLTAGE, B2_VOLTAGE, B3_VOLTAGE,
-        B1_CURRENT, B2_CURRENT, B3_CURRENT,
-        B1_TEMP, B2_TEMP, B3_TEMP
-    ]
-    return await _insert_and_fetch(db, "power_safety", cols, vals)
-
-@router.get("/power_safety", tags=["power_safety"])
-async def list_power_safety(
-    limit: int = Query(50, ge=1, le=500),
-    offset: int = Query(0, ge=0),
-    start: Optional[str] = None,
-    end: Optional[str] = None,
-    db: aiosqlite.Connection = Depends(get_db),
-):
-    rows, total = await _list_by_time(db, "power_safety", "TIMESTAMP", limit, offset, start, end)
-    return {"items": rows, "total": total, "limit": limit, "offset": offset}
-
-@router.get("/power_safety/latest", tags=["power_safety"])
-async def latest_power_safety(db: aiosqlite.Connection = Depends(get_db)):
-    cur = await db.execute("SELECT * FROM power_safety ORDER BY TIMESTAMP DESC LIMIT 1;")
-    row = await cur.fetchone()
-    await cur.close()
-    return dict(row) if row else None
 
-@router.get("/power_safety/{id}", tags=["power_safety"])
-async def get_power_safety(id: int, db: aiosqlite.Connection = Depends(get_db)):
-    row = await _get_by_id(db, "power_safety", id)
-    if not row:
-        raise HTTPException(404, "power_safety not found")
-    return row
-
-@router.delete("/power_safety/{id}", status_code=204, tags=["power_safety"])
-async def delete_power_safety(id: int, db: aiosqlite.Connection = Depends(get_db)):
-    if await _delete_by_id(db, "power_safety", id) == 0:
-        raise HTTPException(404, "power_safety not found")
+@router.get("/stream/stats", tags=["stream"])
+async def stream_stats(broker: RowBroker = Depends(get_broker)):
+    return broker.stats()
 
 
 # ----------------------------------------------------------------------
-# detections
+# Per-table routes, generated from schema.TABLE_SPECS
+#   NOTE: order matters: /latest, /aggregate, /export, /stream and /ws
+#         are registered BEFORE /{id}
+#   NOTE: /latest orders by (TS_US, ID), a backward step on the TS_US
+#         index (O(log n)), usually answered from the hot-window cache.
 # ----------------------------------------------------------------------
-@router.post("/detections", tags=["detections"])
-async def create_detections(
-    CAMERA: str = Form(...),
-    CLASS_NAME: str = Form(...),
-    CONFIDENCE: float = Form(...),
-    BBOX_X: float = Form(...),
-    BBOX_Y: float = Form(...),
-    BBOX_W: float = Form(...),
-    BBOX_H: float = Form(...),
-    DISTANCE: float = Form(...),
-    db: aiosqlite.Connection = Depends(get_db),
-):
-    ts = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-    cols = ["TIMESTAMP", "CAMERA", "CLASS_NAME", "CONFIDENCE", "BBOX_X", "BBOX_Y", "BBOX_W", "BBOX_H", "DISTANCE"]
-    vals = [ts, CAMERA, CLASS_NAME, CONFIDENCE, BBOX_X, BBOX_Y, BBOX_W, BBOX_H, DISTANCE]
-    return await _insert_and_fetch(db, "detections", cols, vals)
-
-@router.get("/detections", tags=["detections"])
-async def list_detections(
-    limit: int = Query(50, ge=1, le=500),
-    offset: int = Query(0, ge=0),
-    start: Optional[str] = None,
-    end: Optional[str] = None,
-    db: aiosqlite.Connection = Depends(get_db),
-):
-    rows, total = await _list_by_time(db, "detections", "TIMESTAMP", limit, offset, start, end)
-    return {"items": rows, "total": total, "limit": limit, "offset": offset}
-
-@router.get("/detections/latest", tags=["detections"])
-async def latest_detections(db: aiosqlite.Connection = Depends(get_db)):
-    cur = await db.execute("SELECT * FROM detections ORDER BY TIMESTAMP DESC LIMIT 1;")
-    row = await cur.fetchone()
-    await cur.close()
-    return dict(row) if row else None
+def _add_table_routes(spec: TableSpec) -> None:
+    name, tags = spec.name, [spec.name]
+
+    async def create(
+        request: Request,
+        writer: GroupCommitWriter = Depends(get_writer),
+        cache: HotWindowCache = Depends(get_cache),
+        broker: RowBroker = Depends(get_broker),
+    ):
+        item = await parse_one(request, spec.model)
+        return RowJSONResponse(
+            await _insert_and_fetch(writer, cache, broker, spec, item)
+        )
+
+    async def create_batch(
+        request: Request,
+        writer: GroupCommitWriter = Depends(get_writer),
+        cache: HotWindowCache = Depends(get_cache),
+        broker: RowBroker = Depends(get_broker),
+    ):
+        rows = await parse_many(request, spec.model)
+        return await _insert_batch(writer, cache, broker, spec, rows)
+
+    async def list_rows(
+        limit: int = Query(50, ge=1, le=500),
+        offset: int = Query(0, ge=0),
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        before_id: Optional[int] = Query(None, description="Page of rows older than this ID"),
+        after_id: Optional[int] = Query(None, description="Page of rows newer than this ID, oldest first"),
+        with_total: bool = Query(True, description="Count matching rows (costly with start/end)"),
+        db: aiosqlite.Connection = Depends(get_db),
+        cache: HotWindowCache = Depends(get_cache),
+    ):
+        rows, total = await _list_by_time(
+            db, cache, spec, "TS_US", limit, offset,
+            _parse_time("start", start), _parse_time("end", end),
+            before_id, after_id, with_total,
+        )
+        # Pass next_cursor back as before_id (or after_id when paging forward)
+        next_cursor = rows[-1]["ID"] if len(rows) == limit else None
+        return RowJSONResponse({
+            "items": rows, "total": total, "limit": limit, "offset": offset,
+            "next_cursor": next_cursor,
+        })
+
+    async def latest(
+        db: aiosqlite.Connection = Depends(get_db),
+        cache: HotWindowCache = Depends(get_cache),
+    ):
+        return RowJSONResponse(await _latest(db, cache, spec))
+
+    async def aggregate(
+        bucket: str = Query("1s", description="Bucket width: <n>ms|s|m|h|d"),
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        fields: Optional[str] = Query(None, description="Comma-separated columns (default: all numeric)"),
+        db: aiosqlite.Connection = Depends(get_db),
+    ):
+        bucket_ms = _parse_bucket(bucket)
+        names = _parse_fields(spec, fields)
+        buckets, source = await _aggregate(
+            db, spec, bucket_ms, names,
+            _parse_time("start", start), _parse_time("end", end),
+        )
+        return RowJSONResponse({
+            "bucket": bucket, "bucket_ms": bucket_ms, "fields": list(names),
+            "source": source, "buckets": buckets,
+        })
+
+    async def export(
+        format: str = Query("npy", pattern="^(npy|arrow|csv)$"),
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        readers: ReaderPool = Depends(get_readers),
+    ):
+        missing = missing_dependency(format)
+        if missing:
+            raise HTTPException(406, f"{missing} is not installed on the server")
+        body = export_stream(
+            readers, spec, format,
+            _parse_time("start", start), _parse_time("end", end),
+        )
+        return StreamingResponse(
+            body, media_type=FORMATS[format],
+            headers={"Content-Disposition": f'attachment; filename="{name}.{format}"'},
+        )
+
+    async def stream(
+        after_id: Optional[int] = Query(None, description="Replay rows after this ID first"),
+        latest: bool = Query(True, description="Start with the current latest row"),
+        last_event_id: Optional[int] = Header(None),
+        readers: ReaderPool = Depends(get_readers),
+        cache: HotWindowCache = Depends(get_cache),
+        broker: RowBroker = Depends(get_broker),
+    ):
+        # EventSource reconnects send Last-Event-ID: resume after that row
+        if after_id is None:
+            after_id = last_event_id
+
+        async def events() -> AsyncIterator[bytes]:
+            async for row in _follow(readers, cache, broker, spec, after_id, latest):
+                if row is None:
+                    yield b": keepalive\n\n"
+                    continue
+                data = json.dumps(row, separators=(",", ":"))
+                yield f"id: {row['ID']}\ndata: {data}\n\n".encode("utf-8")
+
+        return StreamingResponse(
+            events(), media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    async def stream_ws(
+        websocket: WebSocket,
+        after_id: Optional[int] = None,
+        latest: bool = True,
+        readers: ReaderPool = Depends(get_readers),
+        cache: HotWindowCache = Depends(get_cache),
+        broker: RowBroker = Depends(get_broker),
+    ):
+        await websocket.accept()
+
+        async def pump() -> None:
+            async for row in _follow(readers, cache, broker, spec, after_id, latest):
+                if row is not None:
+                    await websocket.send_text(json.dumps(row, separators=(",", ":")))
+
+        # Sending alone would only notice a closed socket on the next row;
+        # watch for the client's close so idle subscriptions are released.
+        sender = asyncio.create_task(pump())
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        except (WebSocketDisconnect, OSError):
+            pass
+        finally:
+            sender.cancel()
+
+    async def get_row(id: int, db: aiosqlite.Connection = Depends(get_db)):
+        row = await _get_by_id(db, spec, id)
+        if not row:
+            raise HTTPException(404, f"{name} not found")
+        return RowJSONResponse(row)
+
+    async def delete_row(
+        id: int,
+        writer: GroupCommitWriter = Depends(get_writer),
+        cache: HotWindowCache = Depends(get_cache),
+    ):
+        if await _delete_by_id(writer, cache, spec, id) == 0:
+            raise HTTPException(404, f"{name} not found")
+        return Response(status_code=204)
+
+    router.add_api_route(
+        f"/{name}", create, methods=["POST"], tags=tags,
+        name=f"create_{name}", openapi_extra=request_body_doc(spec.model),
+    )
+    router.add_api_route(
+        f"/{name}/batch", create_batch, methods=["POST"], tags=tags,
+        name=f"create_{name}_batch",
+        openapi_extra=request_body_doc(spec.model, many=True),
+    )
+    if spec.listable:
+        router.add_api_route(
+            f"/{name}", list_rows, methods=["GET"], tags=tags, name=f"list_{name}"
+        )
+    router.add_api_route(
+        f"/{name}/latest", latest, methods=["GET"], tags=tags, name=f"latest_{name}"
+    )
+    if spec.listable:
+        router.add_api_route(
+            f"/{name}/aggregate", aggregate, methods=["GET"], tags=tags,
+            name=f"aggregate_{name}",
+        )
+        router.add_api_route(
+            f"/{name}/export", export, methods=["GET"], tags=tags,
+            name=f"export_{name}", response_class=StreamingResponse,
+        )
+    router.add_api_route(
+        f"/{name}/stream", stream, methods=["GET"], tags=tags, name=f"stream_{name}",
+        response_class=StreamingResponse,
+    )
+    router.add_api_websocket_route(f"/{name}/ws", stream_ws, name=f"ws_{name}")
+    router.add_api_route(
+        f"/{name}/{{id}}", get_row, methods=["GET"], tags=tags, name=f"get_{name}"
+    )
+    if spec.deletable:
+        router.add_api_route(
+            f"/{name}/{{id}}", delete_row, methods=["DELETE"], status_code=204,
+            tags=tags, name=f"delete_{name}",
+        )
 
-@router.get("/detections/{id}", tags=["detections"])
-async def get_detections(id: int, db: aiosqlite.Connection = Depends(get_db)):
-    row = await _get_by_id(db, "detections", id)
-    if not row:
-        raise HTTPException(404, "detections not found")
-    return row
 
-@router.delete("/detections/{id}", status_code=204, tags=["detections"])
-async def delete_detections(id: int, db: aiosqlite.Connection = Depends(get_db)):
-    if await _delete_by_id(db, "detections", id) == 0:
-        raise HTTPException(404, "detections not found")
+for _spec in ROUTED:
+    _add_table_routes(_spec)
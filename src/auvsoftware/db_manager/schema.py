@@ -0,0 +1,324 @@
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional, Sequence
+
+from pydantic import BaseModel
+
+from models import (
+    DepthCreate,
+    DetectionsCreate,
+    ImuCreate,
+    InputsCreate,
+    OutputsCreate,
+    PidGainsCreate,
+    PowerSafetyCreate,
+)
+
+# Column types that can be aggregated (min/max/mean)
+NUMERIC_TYPES = frozenset(["INTEGER", "REAL", "BOOLEAN"])
+
+# Widths written as <n><unit>, e.g. 500ms, 1s, 5m, 1h
+_WIDTH_RE = re.compile(r"^(\d+)(ms|s|m|h|d)$")
+_WIDTH_UNITS = {"ms": 1, "s": 1000, "m": 60_000, "h": 3_600_000, "d": 86_400_000}
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def parse_width(text: str) -> int:
+    """'500ms' / '1s' / '5m' / '1h' / '1d' -> milliseconds. Raises ValueError."""
+    match = _WIDTH_RE.match(text.strip().lower())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"invalid width '{text}' (e.g. 500ms, 1s, 5m, 1h)")
+    return int(match.group(1)) * _WIDTH_UNITS[match.group(2)]
+
+
+def now_us() -> int:
+    """Current time as Unix epoch microseconds."""
+    return time.time_ns() // 1000
+
+
+def parse_epoch_us(text: str) -> int:
+    """ISO-8601 text (naive means UTC) -> Unix epoch microseconds. Raises ValueError."""
+    dt = datetime.fromisoformat(text.strip().replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - _EPOCH) // timedelta(microseconds=1)
+
+
+@lru_cache(maxsize=4096)
+def _second_text(epoch_s: int) -> str:
+    return datetime.fromtimestamp(epoch_s, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def format_epoch_us(epoch_us: int) -> str:
+    """
+    Unix epoch microseconds -> ISO-8601 UTC text, always with six fractional
+    digits so rendered timestamps sort the same way as the integers.
+    Consecutive rows share their second, so that part is memoised.
+    """
+    epoch_s, us = divmod(epoch_us, 1_000_000)
+    return f"{_second_text(epoch_s)}.{us:06d}Z"
+
+
+@dataclass(frozen=True)
+class Column:
+    name: str
+    sql_type: str  # INTEGER / REAL / TEXT / BOOLEAN ...
+
+
+@dataclass
+class Rollup:
+    """
+    Pre-aggregated copy of a table at a fixed bucket width.
+
+    One row per bucket holds the row count and each numeric column's
+    min/max/sum, keyed by the bucket start in epoch milliseconds. An AFTER
+    INSERT trigger upserts the bucket of every new raw row, so the rollup is
+    maintained incrementally inside the writer's transaction. Rollups
+    summarise everything recorded: deleting raw rows leaves them untouched.
+    """
+    source: str
+    label: str                      # "1s", "1m", ...
+    fields: tuple[str, ...]
+
+    width_ms: int = field(init=False)
+    name: str = field(init=False)
+    create_sql: str = field(init=False)
+    trigger_sql: str = field(init=False)
+    backfill_sql: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.width_ms = parse_width(self.label)
+        self.name = f"{self.source}_{self.label}"
+        w = self.width_ms
+        stats = [(f"{f}_MIN", f"{f}_MAX", f"{f}_SUM") for f in self.fields]
+
+        defs = ["BUCKET INTEGER PRIMARY KEY", "N INTEGER NOT NULL"]
+        defs += [f"{c} REAL" for triple in stats for c in triple]
+        self.create_sql = (
+            f"CREATE TABLE IF NOT EXISTS {self.name} (\n    "
+            + ",\n    ".join(defs)
+            + "\n);"
+        )
+
+        cols = ", ".join(["BUCKET", "N", *(c for triple in stats for c in triple)])
+        new_vals = ", ".join(f"NEW.{f}, NEW.{f}, NEW.{f}" for f in self.fields)
+        merge = ", ".join(
+            f"{mn} = min({mn}, excluded.{mn}), {mx} = max({mx}, excluded.{mx}), "
+            f"{sm} = {sm} + excluded.{sm}"
+            for mn, mx, sm in stats
+        )
+        self.trigger_sql = (
+            f"CREATE TRIGGER IF NOT EXISTS trg_{self.name} AFTER INSERT ON {self.source}\n"
+            f"BEGIN\n"
+            f"    INSERT INTO {self.name} ({cols})\n"
+            f"    VALUES ((NEW.TS_US / {w * 1000}) * {w}, 1, {new_vals})\n"
+            f"    ON CONFLICT(BUCKET) DO UPDATE SET N = N + 1, {merge};\n"
+            f"END;"
+        )
+        aggs = ", ".join(f"MIN({f}), MAX({f}), SUM({f})" for f in self.fields)
+        self.backfill_sql = (
+            f"INSERT INTO {self.name} ({cols}) "
+            f"SELECT (TS_US / {w * 1000}) * {w} AS b, COUNT(*), {aggs} "
+            f"FROM {self.source} GROUP BY b;"
+        )
+
+
+@dataclass
+class TableSpec:
+    """
+    One table of the DB API: its columns, indexes, the pydantic model that
+    validates POST bodies, and which routes are generated for it.
+
+    Time is stored as TS_US, an INTEGER Unix epoch in microseconds, so
+    range, latest and aggregate queries compare integers on the TS_US
+    index. Responses carry it as ISO-8601 text under the TIMESTAMP key,
+    rendered only when a row dict is built.
+
+    All SQL text is built once here. sqlite3 caches prepared statements per
+    connection keyed by SQL text, so reusing these exact strings means each
+    statement is compiled once per connection rather than once per request.
+    """
+    name: str
+    columns: tuple[Column, ...]          # data columns, excluding ID/TS_US
+    model: Optional[type[BaseModel]] = None
+    indexes: tuple[tuple[str, ...], ...] = (("TS_US",),)
+    routed: bool = True
+    listable: bool = True
+    deletable: bool = True
+    rollups: tuple[str, ...] = ()        # rollup widths, e.g. ("1s", "1m")
+    carried: bool = False                # latest row copied into each new session
+
+    # Derived in __post_init__
+    column_names: tuple[str, ...] = field(init=False)   # response keys
+    stored_names: tuple[str, ...] = field(init=False)   # SQL columns
+    create_sql: str = field(init=False)
+    index_sql: tuple[str, ...] = field(init=False)
+    insert_sql: str = field(init=False)
+    select_by_id_sql: str = field(init=False)
+    latest_sql: str = field(init=False)
+    delete_by_id_sql: str = field(init=False)
+    rollup_tables: tuple[Rollup, ...] = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.column_names = ("ID", "TIMESTAMP", *(c.name for c in self.columns))
+        self.stored_names = ("ID", "TS_US", *(c.name for c in self.columns))
+        select = ", ".join(self.stored_names)
+        insert_cols = self.stored_names[1:]
+
+        self.create_sql = self.create_sql_for(self.name)
+        self.index_sql = tuple(
+            f"CREATE INDEX IF NOT EXISTS idx_{self.name}_{'_'.join(cols).lower()} "
+            f"ON {self.name} ({', '.join(cols)});"
+            for cols in self.indexes
+        )
+        # Every insert supplies TS_US, so the statement text never varies
+        self.insert_sql = (
+            f"INSERT INTO {self.name} ({', '.join(insert_cols)}) "
+            f"VALUES ({', '.join('?' * len(insert_cols))});"
+        )
+        self.select_by_id_sql = f"SELECT {select} FROM {self.name} WHERE ID = ?;"
+        self.latest_sql = (
+            f"SELECT {select} FROM {self.name} ORDER BY TS_US DESC, ID DESC LIMIT 1;"
+        )
+        self.delete_by_id_sql = f"DELETE FROM {self.name} WHERE ID = ?;"
+        self.rollup_tables = tuple(
+            Rollup(self.name, label, self.numeric_columns) for label in self.rollups
+        )
+
+    def create_sql_for(self, table: str) -> str:
+        """CREATE TABLE statement for this schema under the name *table*."""
+        defs = [
+            "ID INTEGER PRIMARY KEY AUTOINCREMENT",
+            "TS_US INTEGER NOT NULL",
+            *(f"{c.name} {c.sql_type} NOT NULL" for c in self.columns),
+        ]
+        return (
+            f"CREATE TABLE IF NOT EXISTS {table} (\n    "
+            + ",\n    ".join(defs)
+            + "\n);"
+        )
+
+    @property
+    def numeric_columns(self) -> tuple[str, ...]:
+        return tuple(c.name for c in self.columns if c.sql_type in NUMERIC_TYPES)
+
+    @property
+    def select_sql(self) -> str:
+        """``SELECT <all columns> FROM <table>`` for callers adding clauses."""
+        return f"SELECT {', '.join(self.stored_names)} FROM {self.name}"
+
+    def rollup_for(self, bucket_ms: int) -> Optional[Rollup]:
+        """Widest rollup whose buckets tile *bucket_ms* exactly, if any."""
+        fits = [r for r in self.rollup_tables if bucket_ms % r.width_ms == 0]
+        return max(fits, key=lambda r: r.width_ms, default=None)
+
+    def values(self, item: BaseModel, stamp_us: int) -> tuple:
+        """
+        Insert parameters for *item*, in insert_sql column order. The item's
+        own TIMESTAMP wins over *stamp_us*; raises ValueError if it is not
+        ISO-8601.
+        """
+        ts_us = parse_epoch_us(item.TIMESTAMP) if item.TIMESTAMP else stamp_us
+        return (ts_us, *(getattr(item, c.name) for c in self.columns))
+
+    def inserted(self, row_id: int, values: Sequence) -> dict:
+        """
+        Response dict for a row just inserted with *values*. The values were
+        validated and typed by the model, so the stored row is exactly
+        (row_id, *values) and needs no read-back.
+        """
+        return self.to_dict((row_id, *values))
+
+    def to_dict(self, row: Sequence) -> dict:
+        """Stored tuple row (in stored_names order) -> response dict."""
+        out = dict(zip(self.column_names, row))
+        out["TIMESTAMP"] = format_epoch_us(row[1])
+        return out
+
+
+def _cols(sql_type: str, *names: str) -> tuple[Column, ...]:
+    return tuple(Column(n, sql_type) for n in names)
+
+
+# Rollups kept for the high-rate telemetry tables
+TELEMETRY_ROLLUPS = ("1s", "1m")
+
+
+TABLE_SPECS: tuple[TableSpec, ...] = (
+    TableSpec(
+        "inputs",
+        _cols("INTEGER", "SURGE", "SWAY", "HEAVE", "ROLL", "PITCH", "YAW")
+        + _cols("BOOLEAN", "S1", "S2")
+        + _cols("INTEGER", "S3"),
+        InputsCreate,
+    ),
+    TableSpec(
+        "outputs",
+        _cols("INTEGER", *(f"MOTOR{i}" for i in range(1, 9)), "S1", "S2", "S3"),
+        OutputsCreate,
+        rollups=TELEMETRY_ROLLUPS,
+    ),
+    TableSpec(
+        "hydrophone",
+        _cols("STRING(5)", "HEADING"),
+        routed=False,
+    ),
+    TableSpec(
+        "depth",
+        _cols("REAL", "DEPTH"),
+        DepthCreate,
+        rollups=TELEMETRY_ROLLUPS,
+    ),
+    TableSpec(
+        "imu",
+        _cols(
+            "REAL",
+            "ACCEL_X", "ACCEL_Y", "ACCEL_Z",
+            "GYRO_X", "GYRO_Y", "GYRO_Z",
+            "MAG_X", "MAG_Y", "MAG_Z",
+        ),
+        ImuCreate,
+        rollups=TELEMETRY_ROLLUPS,
+    ),
+    TableSpec(
+        "pid_gains",
+        _cols(
+            "REAL",
+            "ROLL_KP", "ROLL_KI", "ROLL_KD",
+            "PITCH_KP", "PITCH_KI", "PITCH_KD",
+        ),
+        PidGainsCreate,
+        listable=False,
+        deletable=False,
+        carried=True,
+    ),
+    TableSpec(
+        "power_safety",
+        _cols(
+            "INTEGER",
+            "B1_VOLTAGE", "B2_VOLTAGE", "B3_VOLTAGE",
+            "B1_CURRENT", "B2_CURRENT", "B3_CURRENT",
+            "B1_TEMP", "B2_TEMP", "B3_TEMP",
+        ),
+        PowerSafetyCreate,
+        rollups=TELEMETRY_ROLLUPS,
+    ),
+    TableSpec(
+        "detections",
+        _cols("TEXT", "CAMERA", "CLASS_NAME")
+        + _cols(
+            "REAL",
+            "CONFIDENCE", "BBOX_X", "BBOX_Y", "BBOX_W", "BBOX_H", "DISTANCE",
+        ),
+        DetectionsCreate,
+    ),
+)
+
+SPECS: dict[str, TableSpec] = {s.name: s for s in TABLE_SPECS}
+
+# Tables exposed through the API
+ROUTED: tuple[TableSpec, ...] = tuple(s for s in TABLE_SPECS if s.routed)
@@ -0,0 +1,135 @@
+import os
+import re
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+import aiosqlite
+
+from schema import TableSpec
+
+# The database at AUV_DB_PATH, used until the first session is opened
+DEFAULT_SESSION = "default"
+
+# 20261016T235500Z or 20261016T235500Z-pool-test (optionally -2, -3 ...)
+_SESSION_RE = re.compile(r"^\d{8}T\d{6}Z(-[A-Za-z0-9_-]+)?$")
+_NAME_UNSAFE = re.compile(r"[^A-Za-z0-9_-]+")
+
+# SQLite files that make up one database
+_SUFFIXES = ("", "-wal", "-shm")
+
+
+class SessionStore:
+    """
+    Session database files: one SQLite file per mission session.
+
+    Every dive or sim run writes to its own file under *directory*, so
+    dropping a session is an unlink and exporting one is a file copy, and
+    neither touches the rows of any other session. The active session's
+    ID is kept in ``directory/ACTIVE`` so a restarted server resumes it.
+    """
+
+    def __init__(self, default_path: str, directory: str) -> None:
+        self.default_path = default_path
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._active_file = self.directory / "ACTIVE"
+
+    @property
+    def active(self) -> str:
+        try:
+            session_id = self._active_file.read_text().strip()
+        except FileNotFoundError:
+            return DEFAULT_SESSION
+        if self.exists(session_id):
+            return session_id
+        return DEFAULT_SESSION
+
+    def set_active(self, session_id: str) -> None:
+        tmp = self._active_file.with_suffix(".tmp")
+        tmp.write_text(session_id + "\n")
+        os.replace(tmp, self._active_file)
+
+    def path(self, session_id: str) -> str:
+        """Database file of *session_id*. Raises KeyError for malformed IDs."""
+        if session_id == DEFAULT_SESSION:
+            return self.default_path
+        if not _SESSION_RE.match(session_id):
+            raise KeyError(session_id)
+        return str(self.directory / f"{session_id}.db")
+
+    def exists(self, session_id: str) -> bool:
+        try:
+            return os.path.exists(self.path(session_id))
+        except KeyError:
+            return False
+
+    def new_id(self, name: Optional[str] = None) -> str:
+        """A fresh session ID: UTC start time plus an optional name."""
+        base = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+        name = _NAME_UNSAFE.sub("-", name or "").strip("-")[:48]
+        if name:
+            base = f"{base}-{name}"
+        session_id, n = base, 2
+        while self.exists(session_id):
+            session_id, n = f"{base}-{n}", n + 1
+        return session_id
+
+    def info(self, session_id: str) -> dict:
+        path = self.path(session_id)
+        files = [path + s for s in _SUFFIXES if os.path.exists(path + s)]
+        return {
+            "id": session_id,
+            "active": session_id == self.active,
+            "bytes": sum(os.path.getsize(f) for f in files),
+            "modified": max((os.path.getmtime(f) for f in files), default=None),
+        }
+
+    def list(self) -> list[dict]:
+        """Every session, oldest first, the default database first of all."""
+        ids = sorted(
+            p.stem for p in self.directory.glob("*.db") if _SESSION_RE.match(p.stem)
+        )
+        if os.path.exists(self.default_path):
+            ids.insert(0, DEFAULT_SESSION)
+        return [self.info(i) for i in ids]
+
+    def delete(self, session_id: str) -> None:
+        """Remove an inactive session's files."""
+        path = self.path(session_id)
+        for suffix in _SUFFIXES:
+            try:
+                os.remove(path + suffix)
+            except FileNotFoundError:
+                pass
+
+
+async def carry_over(
+    old: aiosqlite.Connection, new: aiosqlite.Connection, specs: Iterable[TableSpec]
+) -> None:
+    """
+    Seed a new session database from the previous one: each table's
+    AUTOINCREMENT counter, so row IDs keep increasing across sessions and
+    stream cursors stay valid, and the latest row of every table marked
+    ``carried`` (e.g. pid_gains), so settings survive the switch.
+    """
+    cur = await old.execute("SELECT name, seq FROM sqlite_sequence;")
+    seqs = await cur.fetchall()
+    await cur.close()
+    for spec in specs:
+        if not spec.carried:
+            continue
+        cur = await old.execute(spec.latest_sql)
+        row = await cur.fetchone()
+        await cur.close()
+        if row is not None:
+            await new.execute(
+                f"INSERT INTO {spec.name} ({', '.join(spec.stored_names)}) "
+                f"VALUES ({', '.join('?' * len(row))});",
+                row,
+            )
+    await new.execute("DELETE FROM sqlite_sequence;")
+    await new.executemany(
+        "INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?);", seqs
+    )
+    await new.commit()
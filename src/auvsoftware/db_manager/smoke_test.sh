@@ -81,6 +81,11 @@ call DELETE "/depth/$DEP_ID"
 say "imu"
 IMU_ID=$(post_and_get_id "/imu" "ACCEL_X=0.1&ACCEL_Y=0.0&ACCEL_Z=-0.1&GYRO_X=0.01&GYRO_Y=-0.02&GYRO_Z=0.03&MAG_X=12.3&MAG_Y=0.4&MAG_Z=-7.8")
 echo "Inserted imu ID=$IMU_ID"
+echo -e "\nPOST /imu/batch"
+curl -sS -X POST "$BASE/imu/batch" -H "Content-Type: application/json" \
+  --data '[{"ACCEL_X":0.1,"ACCEL_Y":0,"ACCEL_Z":-0.1,"GYRO_X":0,"GYRO_Y":0,"GYRO_Z":0,"MAG_X":0,"MAG_Y":0,"MAG_Z":0},
+           {"ACCEL_X":0.2,"ACCEL_Y":0,"ACCEL_Z":-0.1,"GYRO_X":0,"GYRO_Y":0,"GYRO_Z":0,"MAG_X":0,"MAG_Y":0,"MAG_Z":0}]' \
+  -w "\nHTTP %{http_code}\n"
 call GET  "/imu"
 call GET  "/imu/latest"
 call GET  "/imu/$IMU_ID"
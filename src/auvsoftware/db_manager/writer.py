@@ -0,0 +1,187 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+import aiosqlite
+
+log = logging.getLogger(__name__)
+
+# A unit of write work: receives the writer's connection, returns the
+# value handed back to the submitter once its group has committed.
+Job = Callable[[aiosqlite.Connection], Awaitable[Any]]
+
+# Runs between groups while the writer moves to another database:
+# receives (old connection, new connection)
+Prepare = Callable[[aiosqlite.Connection, aiosqlite.Connection], Awaitable[None]]
+
+
+class _Switch:
+    __slots__ = ("connection", "prepare", "fut")
+
+    def __init__(
+        self, connection: aiosqlite.Connection, prepare: Optional[Prepare],
+        fut: asyncio.Future,
+    ) -> None:
+        self.connection = connection
+        self.prepare = prepare
+        self.fut = fut
+
+
+class GroupCommitWriter:
+    """
+    Single writer coroutine that owns every write transaction.
+
+    Callers submit jobs and await their result. The writer runs queued jobs
+    back to back inside one transaction and commits the whole group once,
+    either when ``window_s`` has elapsed since the group started or when
+    ``max_batch`` jobs have run, so many rows share a single fsync. Each job
+    runs under its own SAVEPOINT: a failing job is rolled back on its own
+    and does not take the rest of the group with it. Jobs that issue a
+    single statement can skip the savepoint, since SQLite already undoes a
+    failed statement by itself.
+    """
+
+    def __init__(
+        self,
+        connection: aiosqlite.Connection,
+        window_s: float = 0.005,
+        max_batch: int = 500,
+    ) -> None:
+        self.connection = connection
+        self.window_s = window_s
+        self.max_batch = max_batch
+        self._queue: asyncio.Queue[
+            Optional[tuple[Job, bool, asyncio.Future] | _Switch]
+        ] = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="db-writer")
+
+    async def stop(self) -> None:
+        """Commit everything already queued, then stop the writer task."""
+        if self._task is None:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+
+    async def submit(self, job: Job, single_statement: bool = False) -> Any:
+        """
+        Queue *job* and wait until the group containing it has committed.
+        Pass ``single_statement=True`` when the job runs exactly one
+        statement to save the SAVEPOINT/RELEASE round trips.
+        """
+        if self._task is None:
+            raise RuntimeError("Database writer is not running.")
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((job, single_statement, fut))
+        return await fut
+
+    async def switch(
+        self, connection: aiosqlite.Connection, prepare: Optional[Prepare] = None
+    ) -> None:
+        """
+        Move the writer to *connection*. Jobs queued before the switch
+        commit on the old connection; jobs queued after it run on the new
+        one. *prepare* runs in between, when no transaction is open on
+        either connection. Callers never see the writer stop.
+        """
+        if self._task is None:
+            raise RuntimeError("Database writer is not running.")
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_Switch(connection, prepare, fut))
+        await fut
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        held = None   # switch dequeued mid-group, handled once the group commits
+        while not stopping:
+            item, held = (held or await self._queue.get()), None
+            if item is None:
+                break
+            if isinstance(item, _Switch):
+                await self._switch(item)
+                continue
+
+            await self.connection.execute("BEGIN;")
+            done: list[tuple[asyncio.Future, Any]] = []
+            deadline = loop.time() + self.window_s
+            while True:
+                job, single_statement, fut = item
+                try:
+                    if single_statement:
+                        done.append((fut, await job(self.connection)))
+                    else:
+                        done.append((fut, await self._run_job(job)))
+                except Exception as exc:  # noqa: BLE001 - handed to the submitter
+                    if not fut.done():
+                        fut.set_exception(exc)
+
+                if len(done) >= self.max_batch:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                if isinstance(item, _Switch):
+                    held = item
+                    break
+
+            try:
+                await self.connection.commit()
+            except Exception as exc:  # noqa: BLE001
+                log.exception("group commit of %d jobs failed", len(done))
+                await self.connection.rollback()
+                for fut, _ in done:
+                    if not fut.done():
+                        fut.set_exception(exc)
+                continue
+
+            for fut, result in done:
+                if not fut.done():
+                    fut.set_result(result)
+
+        # Anything queued after the stop sentinel never ran
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is None:
+                continue
+            fut = item.fut if isinstance(item, _Switch) else item[2]
+            if not fut.done():
+                fut.set_exception(RuntimeError("Database writer stopped."))
+
+    async def _switch(self, item: _Switch) -> None:
+        try:
+            if item.prepare is not None:
+                await item.prepare(self.connection, item.connection)
+        except Exception as exc:  # noqa: BLE001 - the writer stays where it was
+            item.fut.set_exception(exc)
+            return
+        self.connection = item.connection
+        item.fut.set_result(None)
+
+    async def _run_job(self, job: Job) -> Any:
+        db = self.connection
+        await db.execute("SAVEPOINT job;")
+        try:
+            result = await job(db)
+        except BaseException:
+            await db.execute("ROLLBACK TO job;")
+            await db.execute("RELEASE job;")
+            raise
+        await db.execute("RELEASE job;")
+        return result
@@ -1,5 +1,4 @@
 import argparse
-import time
 
 from auvsoftware.config import get_env
 from auvsoftware.hardware_interface.i2c_commands import write
@@ -39,7 +38,10 @@ class ESCController:
         if data is None:
             print("No output commands available.")
             return
+        self.apply(data)
 
+    def apply(self, data: dict) -> None:
+        """Send one outputs row to the ESCs."""
         set_thrust(
             data.get("MOTOR1", _NEUTRAL),
             data.get("MOTOR2", _NEUTRAL),
@@ -52,11 +54,10 @@ class ESCController:
         )
 
     def run(self) -> None:
-        """Continuously update ESCs with the latest commands from the API."""
+        """Apply each output command as soon as the API commits it."""
         try:
-            while True:
-                self.update()
-                time.sleep(0.05)  # 20 Hz
+            for data in self.auv_client.subscribe("outputs"):
+                self.apply(data)
         except KeyboardInterrupt:
             print("ESCController stopped by user.")
 
@@ -26,11 +26,7 @@ class MovementController:
     # Internal helpers
     # ------------------------------------------------------------------
 
-    def _reload_gains(self) -> None:
-        try:
-            data = self._client.latest("pid_gains")
-        except Exception:
-            return
+    def _reload_gains(self, data: dict | None) -> None:
         if data is None:
             return
         self._roll_pid.set_gains(
@@ -58,15 +54,20 @@ class MovementController:
     # ------------------------------------------------------------------
 
     def update(self, now: float) -> None:
-        # Reload PID gains from DB on a slow cadence
-        if now - self._last_gains_reload >= _GAINS_RELOAD_INTERVAL:
-            self._reload_gains()
+        # One snapshot per tick: pilot inputs, IMU, and on a slow cadence
+        # the PID gains, all as of the same commit
+        tables = ["inputs", "imu"]
+        reload_gains = now - self._last_gains_reload >= _GAINS_RELOAD_INTERVAL
+        if reload_gains:
+            tables.append("pid_gains")
+        snap = self._client.snapshot(tables)
+
+        if reload_gains:
+            self._reload_gains(snap.get("pid_gains"))
             self._last_gains_reload = now
 
         # Read pilot inputs
-        inputs = self._client.latest("inputs")
-        if inputs is None:
-            inputs = {}
+        inputs = snap.get("inputs") or {}
         surge = inputs.get("SURGE", 0) / _INPUT_SCALE
         sway  = inputs.get("SWAY",  0) / _INPUT_SCALE
         yaw   = inputs.get("YAW",   0) / _INPUT_SCALE
@@ -74,10 +75,7 @@ class MovementController:
 
         # Read IMU and compute stabilisation corrections
         roll_corr = pitch_corr = 0.0
-        try:
-            imu = self._client.latest("imu")
-        except Exception:
-            imu = None
+        imu = snap.get("imu")
         if imu:
             roll_ang, pitch_ang = self._roll_pitch_from_accel(
                 imu.get("ACCEL_X", 0.0),
@@ -1,5 +1,7 @@
 import functools
+import logging
 import multiprocessing
+import os
 from pathlib import Path
 
 from auvsoftware.config import get_env
@@ -9,13 +11,16 @@ _DB_DIR = Path(__file__).parent / "db_manager"
 # Extend this list as high-level packages are implemented.
 _SERVICES: list[str] = ["db", "hardware_interface", "movement", "camera", "ai"]
 
+log = logging.getLogger(__name__)
 
-def _run_db() -> None:
+
+def _run_db(new_session: bool = False) -> None:
     """
     Start the FastAPI DB server.
 
     Inserts the db_manager directory into sys.path so its bare local
     imports (routers, deps, config) resolve without changing those files.
+    With ``new_session`` the server opens a new mission session on startup.
     """
     import logging
     import sys
@@ -27,6 +32,8 @@ def _run_db() -> None:
     log = logging.getLogger(__name__)
 
     sys.path.insert(0, str(_DB_DIR))
+    if new_session:
+        os.environ["AUV_DB_NEW_SESSION"] = "1"
 
     try:
         from run import app  # noqa: PLC0415
@@ -95,19 +102,44 @@ class ProcessManager:
         self._processes: dict[str, multiprocessing.Process] = {}
 
     def start_all(self) -> None:
-        """Start all registered services."""
+        """
+        Start all registered services in a new mission session, so each run
+        records into its own database file.
+        """
+        self.new_session()
         for name in _SERVICES:
             self.start(name)
 
+    def new_session(self) -> None:
+        """
+        Open a new DB session: through the API when the DB server is already
+        running, otherwise by starting it with a fresh session.
+        """
+        if self.dry_run:
+            print("[dry_run] new session")
+            return
+        if not self._is_alive("db"):
+            self.start("db", new_session=True)
+            return
+        from auvsoftware.quick_request import AUVClient, AUVRequestError
+        try:
+            with AUVClient() as client:
+                client.open_session()
+        except (AUVRequestError, OSError):
+            log.exception("could not open a new DB session")
+
     def stop_all(self) -> None:
         """Terminate all running services."""
         for name in list(self._processes):
             self.stop(name)
 
-    def start(self, name: str, *, simulation: bool = False) -> None:
+    def start(
+        self, name: str, *, simulation: bool = False, new_session: bool = False
+    ) -> None:
         """Start a service by name. No-op if already running.
 
-        The ``simulation`` flag is forwarded to ``hardware_interface`` only.
+        The ``simulation`` flag is forwarded to ``hardware_interface`` only,
+        ``new_session`` to ``db`` only.
         """
         if name not in _TARGETS:
             raise ValueError(
@@ -121,6 +153,8 @@ class ProcessManager:
             return
         if name == "hardware_interface":
             target = functools.partial(_run_hardware_interface, simulation=simulation)
+        elif name == "db":
+            target = functools.partial(_run_db, new_session=new_session)
         else:
             target = _TARGETS[name]
         p = multiprocessing.Process(target=target, name=name, daemon=True)
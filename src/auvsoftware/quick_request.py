@@ -9,6 +9,8 @@ Usage
 
     client = AUVClient()                        # defaults to localhost:8000
     client = AUVClient("http://192.168.1.10:8000")
+    client = AUVClient(encoding="form")         # force form bodies (default:
+                                                # msgpack if installed, else JSON)
 
     # POST  ──────────────────────────────────────────
     client.post("inputs",  SURGE=0, SWAY=0, HEAVE=0, ROLL=0, PITCH=0, YAW=0,
@@ -18,23 +20,66 @@ Usage
                            GYRO_X=0.0, GYRO_Y=0.0, GYRO_Z=0.0,
                            MAG_X=0.0, MAG_Y=0.0, MAG_Z=0.0)
 
+    # POST many rows in one round trip / one DB transaction
+    client.post_many("depth", [{"DEPTH": 1.2}, {"DEPTH": 1.3}])
+
     # GET latest / by id / paginated list
     row   = client.latest("depth")
+    state = client.snapshot(["depth", "imu"], rows={"detections": 8})
     row   = client.get("depth", id=3)
     page  = client.list("imu", limit=100, offset=0)
     page  = client.list("inputs", start="2025-01-01T00:00:00Z",
                                   end="2025-12-31T23:59:59Z")
 
+    # Per-second min/max/mean over a time range
+    agg   = client.aggregate("imu", bucket="1s", fields=["ACCEL_X", "ACCEL_Z"],
+                             start="2025-01-01T00:00:00Z")
+
+    # Whole range as a structured NumPy array (one binary download)
+    arr   = client.fetch_array("imu", start="2025-01-01T00:00:00Z")
+    arr["ACCEL_X"], arr["TIMESTAMP"]            # float64, datetime64[us]
+
     # DELETE
     client.delete("inputs", id=7)
+
+    # Mission sessions: one database file per run
+    client.open_session("pool-test")
+    client.list_sessions()
+    client.download_session("20250101T120000Z-pool-test", "run.db")
+    client.delete_session("20250101T120000Z-pool-test")
+
+    # Follow new rows as they are committed (server push, no polling)
+    for row in client.subscribe("outputs"):
+        ...
 """
 
 from __future__ import annotations
 
-from typing import Any, Optional
+import json
+import logging
+import time
+from typing import Any, Iterable, Iterator, Optional
 
 import requests
 
+try:
+    import msgpack
+except ImportError:  # optional: fall back to JSON bodies
+    msgpack = None
+
+try:
+    import numpy as np
+except ImportError:  # optional: only fetch_array() needs it
+    np = None
+
+log = logging.getLogger(__name__)
+
+# Request body encodings understood by the DB API, fastest first
+ENCODINGS = ("msgpack", "json", "form")
+
+# Streams carry a keepalive every 15 s; silence longer than this is a dead link
+_STREAM_READ_TIMEOUT = 45.0
+
 
 class AUVRequestError(RuntimeError):
     """Raised when the API returns a non-2xx status."""
@@ -54,9 +99,22 @@ class AUVClient:
         self,
         base_url: str = "http://localhost:8000",
         timeout: float = 5.0,
+        encoding: Optional[str] = None,
     ) -> None:
+        """
+        *encoding* selects the POST body format: "msgpack", "json" or "form".
+        By default msgpack is used when the package is installed, otherwise
+        JSON. If the server rejects msgpack (415), the client drops to JSON.
+        """
+        if encoding is None:
+            encoding = "msgpack" if msgpack is not None else "json"
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown encoding '{encoding}'. Valid: {list(ENCODINGS)}")
+        if encoding == "msgpack" and msgpack is None:
+            raise ValueError("encoding='msgpack' requires the msgpack package")
         self.base_url = base_url.rstrip("/")
         self.timeout  = timeout
+        self.encoding = encoding
         self._session = requests.Session()
 
     # ------------------------------------------------------------------
@@ -73,13 +131,45 @@ class AUVClient:
         """
         self._check_table(table)
         data = {k.upper(): v for k, v in fields.items()}
-        return self._request("POST", f"/{table}", data=data)
+        return self._post_body(f"/{table}", data)
+
+    def post_many(self, table: str, rows: Iterable[dict]) -> dict:
+        """
+        Insert several rows into *table* in one request and one transaction.
+        Each row is a dict of column values (keys normalised to UPPER_CASE).
+        Rows may carry their own TIMESTAMP; otherwise the server stamps them.
+
+        Returns {"inserted": int, "first_id": int | None, "last_id": int | None}.
+        """
+        self._check_table(table)
+        body = [{k.upper(): v for k, v in row.items()} for row in rows]
+        return self._post_body(f"/{table}/batch", body)
 
     def latest(self, table: str) -> Optional[dict]:
         """Return the most-recent row from *table*, or None if empty."""
         self._check_table(table)
         return self._request("GET", f"/{table}/latest")
 
+    def snapshot(
+        self,
+        tables: Iterable[str],
+        *,
+        rows: Optional[dict[str, int]] = None,
+    ) -> dict:
+        """
+        Latest row of each of *tables* in one request, all read from the same
+        database snapshot. Tables in *rows* return their newest n rows
+        instead, as a list (newest first).
+
+        Response shape: {table: dict | None, ..., row_table: [dict, ...]}
+        """
+        rows = rows or {}
+        names = list(dict.fromkeys([*tables, *rows]))
+        for name in names:
+            self._check_table(name)
+        spec = ",".join(f"{n}:{rows[n]}" if n in rows else n for n in names)
+        return self._request("GET", "/snapshot", params={"tables": spec})
+
     def get(self, table: str, id: int) -> dict:
         """Return a single row by primary key.  Raises AUVRequestError on 404."""
         self._check_table(table)
@@ -93,13 +183,20 @@ class AUVClient:
         offset: int = 0,
         start: Optional[str] = None,
         end:   Optional[str] = None,
+        before_id: Optional[int] = None,
+        after_id:  Optional[int] = None,
+        with_total: bool = True,
     ) -> dict:
         """
-        Return a paginated list of rows from *table*.
+        Return a paginated list of rows from *table*, newest first.
 
-        Response shape: {"items": [...], "total": int, "limit": int, "offset": int}
+        Response shape: {"items": [...], "total": int | None, "limit": int,
+                         "offset": int, "next_cursor": int | None}
 
         *start* / *end* are optional ISO-8601 UTC strings to filter by TIMESTAMP.
+        For deep paging pass the previous page's next_cursor as *before_id*;
+        *after_id* pages forward, oldest first. *with_total=False* skips
+        counting the matching rows.
         """
         self._check_table(table)
         params: dict[str, Any] = {"limit": limit, "offset": offset}
@@ -107,13 +204,191 @@ class AUVClient:
             params["start"] = start
         if end:
             params["end"] = end
+        if before_id is not None:
+            params["before_id"] = before_id
+        if after_id is not None:
+            params["after_id"] = after_id
+        if not with_total:
+            params["with_total"] = "false"
         return self._request("GET", f"/{table}", params=params)
 
+    def iter_rows(
+        self,
+        table: str,
+        *,
+        start: Optional[str] = None,
+        end:   Optional[str] = None,
+        page_size: int = 500,
+    ) -> Iterator[dict]:
+        """Yield every row of *table* in [start, end], oldest first."""
+        after_id = 0
+        while True:
+            page = self.list(
+                table, limit=page_size, start=start, end=end,
+                after_id=after_id, with_total=False,
+            )
+            yield from page["items"]
+            if page["next_cursor"] is None:
+                return
+            after_id = page["next_cursor"]
+
+    def aggregate(
+        self,
+        table: str,
+        *,
+        bucket: str = "1s",
+        start:  Optional[str] = None,
+        end:    Optional[str] = None,
+        fields: Optional[Iterable[str]] = None,
+    ) -> dict:
+        """
+        Per-bucket count and min/max/mean of *fields* (default: every numeric
+        column), e.g. bucket="1s", "500ms", "1m".
+
+        Response shape: {"bucket": str, "bucket_ms": int, "fields": [...],
+                         "source": "raw" | rollup table name,
+                         "buckets": [{"start": str, "count": int,
+                                      FIELD: {"min", "max", "mean"}, ...}]}
+        """
+        self._check_table(table)
+        params: dict[str, Any] = {"bucket": bucket}
+        if start:
+            params["start"] = start
+        if end:
+            params["end"] = end
+        if fields:
+            params["fields"] = ",".join(fields)
+        return self._request("GET", f"/{table}/aggregate", params=params)
+
+    def fetch_array(
+        self,
+        table: str,
+        *,
+        start: Optional[str] = None,
+        end:   Optional[str] = None,
+    ) -> "np.ndarray":
+        """
+        Every row of *table* in [start, end] as a structured NumPy array,
+        oldest first. Fields are the table's columns; TIMESTAMP is
+        datetime64[us] (UTC), TEXT columns are fixed-width unicode.
+
+        Downloads GET /{table}/export?format=npy and reads the records
+        straight into the array, so no per-row objects are built.
+        """
+        if np is None:
+            raise RuntimeError("fetch_array() requires the numpy package")
+        self._check_table(table)
+        url = f"{self.base_url}/{table}/export"
+        params: dict[str, Any] = {"format": "npy"}
+        if start:
+            params["start"] = start
+        if end:
+            params["end"] = end
+        with self._session.get(
+            url, params=params, stream=True,
+            timeout=(self.timeout, _STREAM_READ_TIMEOUT),
+        ) as resp:
+            if not resp.ok:
+                raise AUVRequestError("GET", url, resp.status_code, resp.text)
+            raw = resp.raw
+            raw.decode_content = True
+            np.lib.format.read_magic(raw)
+            shape, _, dtype = np.lib.format.read_array_header_1_0(raw)
+            arr = np.empty(shape, dtype=dtype)
+            buf = memoryview(arr.view(np.uint8))
+            got = 0
+            while got < len(buf):
+                n = raw.readinto(buf[got:])
+                if not n:
+                    raise AUVRequestError(
+                        "GET", url, resp.status_code,
+                        f"export ended after {got} of {len(buf)} bytes",
+                    )
+                got += n
+        return arr
+
     def delete(self, table: str, id: int) -> None:
         """Delete a row by primary key.  Raises AUVRequestError on 404."""
         self._check_table(table)
         self._request("DELETE", f"/{table}/{id}")
 
+    def open_session(self, name: Optional[str] = None) -> dict:
+        """
+        Start a new mission session: later rows go to a fresh database file.
+        Returns {"id": str, "active": True, "bytes": int, "modified": float}.
+        """
+        params = {"name": name} if name else None
+        return self._request("POST", "/sessions", params=params)
+
+    def list_sessions(self) -> dict:
+        """Return {"active": str, "sessions": [{"id", "active", "bytes", "modified"}]}."""
+        return self._request("GET", "/sessions")
+
+    def download_session(self, session_id: str, path: str) -> None:
+        """Save an inactive session's SQLite file to *path*."""
+        url = f"{self.base_url}/sessions/{session_id}/file"
+        with self._session.get(
+            url, stream=True, timeout=(self.timeout, _STREAM_READ_TIMEOUT)
+        ) as resp:
+            if not resp.ok:
+                raise AUVRequestError("GET", url, resp.status_code, resp.text)
+            with open(path, "wb") as f:
+                for chunk in resp.iter_content(chunk_size=1 << 20):
+                    f.write(chunk)
+
+    def delete_session(self, session_id: str) -> None:
+        """Delete an inactive session's database file."""
+        self._request("DELETE", f"/sessions/{session_id}")
+
+    def subscribe(
+        self,
+        table: str,
+        *,
+        after_id: Optional[int] = None,
+        latest: bool = True,
+        reconnect: bool = True,
+        retry_s: float = 1.0,
+    ) -> Iterator[dict]:
+        """
+        Yield rows of *table* as the server commits them (SSE /{table}/stream).
+
+        Starts with the current latest row unless *latest* is False, or with
+        the rows after *after_id* when resuming. If the connection drops the
+        client reconnects after *retry_s* and resumes after the last row it
+        yielded, so rows are neither missed nor repeated.
+        """
+        self._check_table(table)
+        url = f"{self.base_url}/{table}/stream"
+        last_id = after_id
+        while True:
+            params: dict[str, Any] = {"latest": "true" if latest else "false"}
+            if last_id is not None:
+                params["after_id"] = last_id
+            try:
+                with self._session.get(
+                    url, params=params, stream=True,
+                    timeout=(self.timeout, _STREAM_READ_TIMEOUT),
+                ) as resp:
+                    if not resp.ok:
+                        raise AUVRequestError("GET", url, resp.status_code, resp.text)
+                    data: list[str] = []
+                    for line in resp.iter_lines(chunk_size=None, decode_unicode=True):
+                        if line.startswith("data:"):
+                            data.append(line[5:].lstrip())
+                        elif not line and data:
+                            row = json.loads("\n".join(data))
+                            data = []
+                            last_id = row["ID"]
+                            yield row
+            except requests.RequestException as exc:
+                if not reconnect:
+                    raise
+                log.warning("stream %s lost (%s); reconnecting", table, exc)
+            else:
+                if not reconnect:
+                    return
+            time.sleep(retry_s)
+
     # ------------------------------------------------------------------
     # Internals
     # ------------------------------------------------------------------
@@ -124,20 +399,42 @@ class AUVClient:
                 f"Unknown table '{table}'. Valid tables: {sorted(self.TABLES)}"
             )
 
+    def _post_body(self, path: str, payload: Any) -> Any:
+        """POST *payload* in the negotiated encoding (batches never use form)."""
+        encoding = self.encoding
+        if encoding == "form" and isinstance(payload, dict):
+            return self._request("POST", path, data=payload)
+        if encoding == "msgpack":
+            body = msgpack.packb(payload)
+            headers = {"Content-Type": "application/msgpack"}
+        else:
+            body = json.dumps(payload).encode("utf-8")
+            headers = {"Content-Type": "application/json"}
+        try:
+            return self._request("POST", path, data=body, headers=headers)
+        except AUVRequestError as exc:
+            if exc.status != 415 or encoding != "msgpack":
+                raise
+            log.info("server does not accept msgpack; switching to JSON bodies")
+            self.encoding = "json"
+            return self._post_body(path, payload)
+
     def _request(
         self,
         method: str,
         path: str,
         *,
-        data:   Optional[dict] = None,
-        params: Optional[dict] = None,
+        data:    Any = None,
+        params:  Optional[dict] = None,
+        headers: Optional[dict] = None,
     ) -> Any:
         url = self.base_url + path
         resp = self._session.request(
             method,
             url,
-            data=data,         # sent as form-encoded (matches Form(...) endpoints)
+            data=data,         # dict → form-encoded; bytes → raw body
             params=params,
+            headers=headers,
             timeout=self.timeout,
         )
         if not resp.ok:
@@ -172,20 +469,32 @@ def _get_default() -> AUVClient:
     return _default_client
 
 
-def configure(base_url: str = "http://localhost:8000", timeout: float = 5.0) -> None:
+def configure(
+    base_url: str = "http://localhost:8000",
+    timeout: float = 5.0,
+    encoding: Optional[str] = None,
+) -> None:
     """Override the default client settings (call once at startup)."""
     global _default_client
-    _default_client = AUVClient(base_url=base_url, timeout=timeout)
+    _default_client = AUVClient(base_url=base_url, timeout=timeout, encoding=encoding)
 
 
 def post(table: str, **fields: Any) -> dict:
     return _get_default().post(table, **fields)
 
 
+def post_many(table: str, rows: Iterable[dict]) -> dict:
+    return _get_default().post_many(table, rows)
+
+
 def latest(table: str) -> Optional[dict]:
     return _get_default().latest(table)
 
 
+def snapshot(tables: Iterable[str], **kwargs: Any) -> dict:
+    return _get_default().snapshot(tables, **kwargs)
+
+
 def get(table: str, id: int) -> dict:
     return _get_default().get(table, id)
 
@@ -197,9 +506,31 @@ def list_rows(
     offset: int = 0,
     start:  Optional[str] = None,
     end:    Optional[str] = None,
+    before_id: Optional[int] = None,
+    after_id:  Optional[int] = None,
+    with_total: bool = True,
 ) -> dict:
-    return _get_default().list(table, limit=limit, offset=offset, start=start, end=end)
+    return _get_default().list(
+        table, limit=limit, offset=offset, start=start, end=end,
+        before_id=before_id, after_id=after_id, with_total=with_total,
+    )
+
+
+def aggregate(table: str, **kwargs: Any) -> dict:
+    return _get_default().aggregate(table, **kwargs)
+
+
+def fetch_array(table: str, **kwargs: Any) -> "np.ndarray":
+    return _get_default().fetch_array(table, **kwargs)
 
 
 def delete(table: str, id: int) -> None:
-    _get_default().delete(table, id)
\ No newline at end of file
+    _get_default().delete(table, id)
+
+
+def open_session(name: Optional[str] = None) -> dict:
+    return _get_default().open_session(name)
+
+
+def subscribe(table: str, **kwargs: Any) -> Iterator[dict]:
+    return _get_default().subscribe(table, **kwargs)
\ No newline at end of file
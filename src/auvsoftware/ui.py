@@ -87,6 +87,7 @@ except ImportError:
     class AUVClient:  # type: ignore[no-redef]
         """Stub — replace with auvsoftware.quick_request.AUVClient."""
         def latest(self, table: str) -> dict | None: return None
+        def snapshot(self, tables: Any, **_: Any) -> dict: return {}
         def post(self, table: str, **fields: Any) -> None: ...
 
 
@@ -689,12 +690,13 @@ class AUVControlApp(App):
     @work(exclusive=True, thread=True, group="telemetry")
     def _poll_telemetry(self) -> None:
         online = True
+        try:
+            snap = self.client.snapshot(TELEMETRY_TABLES)   # EXTERNAL: read
+        except Exception:
+            online = False
+            snap = {}
         for table in TELEMETRY_TABLES:
-            try:
-                row = self.client.latest(table)             # EXTERNAL: read
-            except Exception:
-                online = False
-                row = None
+            row = snap.get(table)
             if not row:
                 continue
             self._ingest_telemetry(table, row)